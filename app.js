@@ -51,7 +51,7 @@ async function sendMessage() {
     const loadingId = showLoading();
 
     try {
-        const response = await fetch(`${API_URL}/chat`, {
+        const response = await fetch(`${API_URL}/chat/stream`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -62,21 +62,43 @@ async function sendMessage() {
             })
         });
 
-        if (!response.ok) {
+        if (!response.ok || !response.body) {
             throw new Error('API request failed');
         }
 
-        const data = await response.json();
-
-        // Remove loading indicator
-        removeLoading(loadingId);
-
-        // Add assistant response
-        addMessage('assistant', data.response, {
-            source: data.source,
-            confidence: data.confidence
+        // Render text as it streams in, then the final message with its source tag
+        let streamedText = '';
+        let streamingText = null;
+        let finished = false;
+
+        await readEvents(response, (event, data) => {
+            if (event === 'delta') {
+                if (!streamingText) {
+                    removeLoading(loadingId);
+                    streamingText = addMessage('assistant', '');
+                }
+                streamedText += data.text;
+                streamingText.innerHTML = formatMessage(streamedText);
+                scrollToBottom();
+            } else if (event === 'done') {
+                if (streamingText) {
+                    streamingText.closest('.message').remove();
+                }
+                removeLoading(loadingId);
+                addMessage('assistant', data.response, {
+                    source: data.source,
+                    confidence: data.confidence
+                });
+                finished = true;
+            } else if (event === 'error') {
+                throw new Error(data.message);
+            }
         });
 
+        if (!finished) {
+            throw new Error('Response stream ended early');
+        }
+
     } catch (error) {
         console.error('Error:', error);
         removeLoading(loadingId);
@@ -89,6 +111,33 @@ async function sendMessage() {
     }
 }
 
+// Read a server-sent event stream, calling onEvent(event, data) per event
+async function readEvents(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const block = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = 'message';
+            let data = '';
+            for (const line of block.split('\n')) {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            }
+            onEvent(event, JSON.parse(data));
+        }
+    }
+}
+
 // Add message to chat
 function addMessage(role, text, metadata = {}) {
     const messageDiv = document.createElement('div');
@@ -120,6 +169,8 @@ function addMessage(role, text, metadata = {}) {
 
     messagesContainer.appendChild(messageDiv);
     scrollToBottom();
+
+    return messageText;
 }
 
 // Format message text
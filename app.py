@@ -2,51 +2,159 @@
 Flask REST API for Crypto Assistant
 Main application entry point
 """
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import logging
+import orjson
+import os
 import uuid
 
-from config import Config
+from config import Config, configure_logging
 from knowledge_base import KnowledgeBaseManager
-from crypto_tools import FreeCryptoAPITool, CryptoNewsTool
+from crypto_tools import FreeCryptoAPITool, CryptoNewsTool, create_http_session
 from memory import SessionManager
 from detector import CryptoQueryDetector
 from llm_orchestrator import LLMOrchestrator
 from pipeline import KnowledgeFirstPipeline
 
+configure_logging()
+log = logging.getLogger(__name__)
+
+
+class ORJSONProvider(JSONProvider):
+    """Flask JSON provider backed by orjson"""
+    
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 # Initialize Flask app
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 CORS(app)
 
 # Validate configuration
 try:
     Config.validate()
-    print("✓ Configuration validated")
+    log.info("✓ Configuration validated")
 except ValueError as e:
-    print(f"✗ Configuration error: {e}")
-    print("Please set API keys in .env file")
+    log.error("✗ Configuration error: %s", e)
+    log.error("Please set API keys in .env file")
     exit(1)
 
 # Initialize components
-print("Initializing components...")
-kb_manager = KnowledgeBaseManager(Config.KB_FILE_PATH)
-session_manager = SessionManager(Config.KNOWN_COINS)
+log.info("Initializing components...")
+kb_manager = KnowledgeBaseManager(Config.KB_FILE_PATH, flush_delay_seconds=Config.KB_FLUSH_SECONDS)
+session_manager = SessionManager(Config.KNOWN_COINS, max_turns=Config.MAX_CONVERSATION_TURNS)
 llm_orchestrator = LLMOrchestrator(Config.OPENAI_API_KEY)
 
-print(f"✓ Knowledge Base loaded ({len(kb_manager.get_all_coins())} coins)")
-print("✓ All components initialized")
+# Shared across requests: pooled HTTP connections, tools and pipeline.
+# Only the per-session memory is bound on each request.
+http_session = create_http_session(http2=Config.HTTP2)
+
+api_tool = FreeCryptoAPITool(
+    api_key=Config.FREECRYPTO_API_KEY,
+    kb_manager=kb_manager,
+    freshness_ttl_minutes=Config.FRESHNESS_TTL_MINUTES,
+    session=http_session
+)
+
+news_tool = CryptoNewsTool(
+    api_key=Config.CRYPTONEWS_API_KEY,
+    kb_manager=kb_manager,
+    session=http_session
+)
+
+detector = CryptoQueryDetector(Config.KNOWN_COINS)
+
+pipeline = KnowledgeFirstPipeline(
+    kb_manager=kb_manager,
+    api_tool=api_tool,
+    news_tool=news_tool,
+    detector=detector,
+    llm_orchestrator=llm_orchestrator
+)
+
+# Intents answered from live price data (prefetched for batch requests)
+PRICE_INTENTS = ("price", "market_cap", "comparison")
+batch_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="chat-batch")
+
+log.info("✓ Knowledge Base loaded (%d coins)", kb_manager.coin_count())
+log.info("✓ All components initialized")
+
+
+def _cacheable_json(payload: dict, max_age: int = 1):
+    """JSON response with ETag/Cache-Control so probes and proxies can revalidate (304)"""
+    response = jsonify(payload)
+    response.set_etag(hashlib.blake2b(response.get_data(), digest_size=8).hexdigest())
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    return response.make_conditional(request)
 
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({
+    return _cacheable_json({
         "status": "healthy",
         "version": "1.0.0",
-        "coins_in_kb": len(kb_manager.get_all_coins())
+        "coins_in_kb": kb_manager.coin_count()
     })
 
 
+def _process_chat(message: str, session_id: str, detection: dict = None) -> dict:
+    """
+    Run one message through the pipeline and record the exchange in session memory
+    
+    Args:
+        message: User message
+        session_id: Conversation session
+        detection: detector.detect() result for the message, if the caller
+            already has one that session memory can't change
+    """
+    # Get or create session memory
+    memory = session_manager.get_memory(session_id)
+    
+    # Add user message to memory
+    if detection is None:
+        detection = detector.detect(message, memory=memory)
+    memory.add_turn("user", message, detection["detected_entity"])
+    
+    # Process query (reusing the detection above)
+    result = pipeline.process_query_with_detection(message, detection)
+    
+    # Format final response
+    formatted_response = pipeline.format_final_response(result)
+    
+    # Add assistant response to memory
+    memory.add_turn("assistant", formatted_response, result["entity"])
+    
+    return _chat_payload(result, formatted_response, session_id)
+
+
+def _chat_payload(result: dict, formatted_response: str, session_id: str) -> dict:
+    """/api/chat response body for a pipeline result"""
+    return {
+        "response": formatted_response,
+        "source": result["source"],
+        "confidence": result["confidence"],
+        "entity": result["entity"],
+        "intent": result["intent"],
+        "session_id": session_id
+    }
+
+
+def _sse(event: str, payload: dict) -> str:
+    """Encode one server-sent event"""
+    return f"event: {event}\ndata: {orjson.dumps(payload).decode('utf-8')}\n\n"
+
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     """Main chat endpoint"""
@@ -60,56 +168,163 @@ def chat():
                 "error": "Message is required"
             }), 400
         
-        # Get or create session memory
-        memory = session_manager.get_memory(session_id)
+        return jsonify(_process_chat(message, session_id))
+    
+    except Exception as e:
+        log.exception("Error processing request: %s", e)
+        return jsonify({
+            "error": "Internal server error",
+            "message": str(e)
+        }), 500
+
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Streaming chat endpoint (server-sent events)
+    
+    Body: same as /api/chat.
+    Emits "delta" events ({"text": str}) as the answer is generated, then a
+    single "done" event carrying the /api/chat response body (or "error").
+    """
+    try:
+        data = request.json
+        message = data.get('message', '').strip()
+        session_id = data.get('session_id', 'default')
+        
+        if not message:
+            return jsonify({
+                "error": "Message is required"
+            }), 400
         
-        # Initialize session-specific components
-        api_tool = FreeCryptoAPITool(
-            api_key=Config.FREECRYPTO_API_KEY,
-            kb_manager=kb_manager,
-            freshness_ttl_minutes=Config.FRESHNESS_TTL_MINUTES
-        )
-        
-        news_tool = CryptoNewsTool(
-            api_key=Config.CRYPTONEWS_API_KEY,
-            kb_manager=kb_manager
-        )
-        
-        detector = CryptoQueryDetector(Config.KNOWN_COINS, memory)
-        
-        pipeline = KnowledgeFirstPipeline(
-            kb_manager=kb_manager,
-            api_tool=api_tool,
-            news_tool=news_tool,
-            detector=detector,
-            memory=memory,
-            llm_orchestrator=llm_orchestrator
-        )
-        
-        # Add user message to memory
-        detection = detector.detect(message)
+        memory = session_manager.get_memory(session_id)
+        detection = detector.detect(message, memory=memory)
         memory.add_turn("user", message, detection["detected_entity"])
         
-        # Process query
-        result = pipeline.process_query(message)
+        # KB/API lookups happen here; only the LLM formatting is streamed
+        result = pipeline.process_query_with_detection(message, detection, stream=True)
+    
+    except Exception as e:
+        log.exception("Error processing request: %s", e)
+        return jsonify({
+            "error": "Internal server error",
+            "message": str(e)
+        }), 500
+    
+    def events():
+        chunks = result["response"]
+        if isinstance(chunks, str):
+            chunks = (chunks,)
         
-        # Format final response
-        formatted_response = pipeline.format_final_response(result)
+        try:
+            parts = []
+            for chunk in chunks:
+                parts.append(chunk)
+                yield _sse("delta", {"text": chunk})
+            
+            result["response"] = "".join(parts)
+            formatted_response = pipeline.format_final_response(result)
+            memory.add_turn("assistant", formatted_response, result["entity"])
+            
+            yield _sse("done", _chat_payload(result, formatted_response, session_id))
+        except Exception as e:
+            log.exception("Error streaming response: %s", e)
+            yield _sse("error", {
+                "error": "Internal server error",
+                "message": str(e)
+            })
+    
+    return Response(events(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+
+@app.route('/api/chat/batch', methods=['POST'])
+def chat_batch():
+    """
+    Process several chat messages in one request
+    
+    Body: {"messages": [{"message": str, "session_id": str}, ...]}
+    Returns {"responses": [...]} in the same order as the input.
+    Messages of one session run in order; different sessions run concurrently.
+    """
+    try:
+        data = request.json
+        items = data.get('messages')
         
-        # Add assistant response to memory
-        memory.add_turn("assistant", formatted_response, result["entity"])
+        if not isinstance(items, list) or not items:
+            return jsonify({
+                "error": "A non-empty 'messages' list is required"
+            }), 400
         
-        return jsonify({
-            "response": formatted_response,
-            "source": result["source"],
-            "confidence": result["confidence"],
-            "entity": result["entity"],
-            "intent": result["intent"],
-            "session_id": session_id
-        })
+        if len(items) > Config.MAX_BATCH_MESSAGES:
+            return jsonify({
+                "error": f"At most {Config.MAX_BATCH_MESSAGES} messages per batch"
+            }), 400
+        
+        responses = [None] * len(items)
+        turns_by_session = {}
+        
+        for index, item in enumerate(items):
+            item = item if isinstance(item, dict) else {}
+            message = str(item.get('message') or '').strip()
+            session_id = item.get('session_id', 'default')
+            
+            if not isinstance(session_id, str):
+                responses[index] = {
+                    "error": "session_id must be a string",
+                    "session_id": session_id
+                }
+                continue
+            
+            if not message:
+                responses[index] = {
+                    "error": "Message is required",
+                    "session_id": session_id
+                }
+                continue
+            
+            # Detected without session memory. Session memory only matters
+            # for pronoun fallback when no coin is named, so detections that
+            # found coins or rejected the message are reused when processing
+            detection = detector.detect(message)
+            if not (detection["detected_entities"] or detection["should_reject"]):
+                detection = None
+            turns_by_session.setdefault(session_id, []).append((index, message, detection))
+        
+        # Warm the price cache once for every coin the batch asks about
+        symbols = []
+        for turns in turns_by_session.values():
+            for _, _, detection in turns:
+                if detection is not None and detection["detected_intent"] in PRICE_INTENTS:
+                    symbols.extend(detection["detected_entities"])
+        if symbols:
+            api_tool.get_crypto_data_many(symbols)
+        
+        def run_session(session_id, turns):
+            for index, message, detection in turns:
+                try:
+                    responses[index] = _process_chat(message, session_id, detection)
+                except Exception as e:
+                    log.exception("Error processing batch message: %s", e)
+                    responses[index] = {
+                        "error": "Internal server error",
+                        "message": str(e),
+                        "session_id": session_id
+                    }
+        
+        futures = [
+            batch_executor.submit(run_session, session_id, turns)
+            for session_id, turns in turns_by_session.items()
+        ]
+        for future in futures:
+            future.result()
+        
+        return jsonify({"responses": responses})
     
     except Exception as e:
-        print(f"Error processing request: {e}")
+        log.exception("Error processing batch request: %s", e)
         return jsonify({
             "error": "Internal server error",
             "message": str(e)
@@ -140,13 +355,26 @@ def reset_conversation():
 @app.route('/api/sessions', methods=['GET'])
 def get_sessions():
     """Get active sessions (debugging)"""
-    return jsonify({
+    return _cacheable_json({
         "active_sessions": list(session_manager.sessions.keys()),
         "count": len(session_manager.sessions)
     })
 
 
 if __name__ == '__main__':
+    if Config.PROD:
+        # Hand over to gunicorn. One worker process: the KB file writer,
+        # caches, request coalescing and the CoinGecko rate limiter are
+        # per-process state, so all threads must share a single copy
+        os.execvp("gunicorn", [
+            "gunicorn",
+            "-k", "gthread",
+            "-w", "1",
+            "--threads", "32",
+            "--bind", f"{Config.FLASK_HOST}:{Config.FLASK_PORT}",
+            "wsgi:app"
+        ])
+    
     print(f"\n{'='*50}")
     print("🚀 Crypto Assistant API Server")
     print(f"{'='*50}")
@@ -1,7 +1,12 @@
 """
 Configuration management for Crypto Assistant
 """
+import atexit
+import logging
+import logging.handlers
 import os
+import queue
+from types import MappingProxyType
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -24,19 +29,27 @@ class Config:
     FLASK_HOST = os.getenv("FLASK_HOST", "127.0.0.1")
     FLASK_PORT = int(os.getenv("FLASK_PORT", "5000"))
     FLASK_DEBUG = os.getenv("FLASK_DEBUG", "False").lower() == "true"
+    PROD = os.getenv("PROD", "0") == "1"  # serve via gunicorn (see wsgi.py)
     
     # Knowledge Base settings
     KB_FILE_PATH = os.path.join(os.path.dirname(__file__), "knowledge", "coins.json")
     FRESHNESS_TTL_MINUTES = int(os.getenv("FRESHNESS_TTL_MINUTES", "5"))
+    KB_FLUSH_SECONDS = float(os.getenv("KB_FLUSH_SECONDS", "2"))  # debounce for KB file writes
     
     # Memory settings
     MAX_CONVERSATION_TURNS = int(os.getenv("MAX_CONVERSATION_TURNS", "10"))
     
+    # Most messages accepted by one /api/chat/batch request
+    MAX_BATCH_MESSAGES = int(os.getenv("MAX_BATCH_MESSAGES", "20"))
+    
+    # Upstream HTTP settings
+    HTTP2 = os.getenv("HTTP2", "0") == "1"  # requires httpx[http2]
+    
     # FreeCryptoAPI settings
     FREECRYPTO_BASE_URL = "https://api.freecryptoapi.com/v1"
     
-    # Known coins (symbol -> name mapping)
-    KNOWN_COINS = {
+    # Known coins (symbol -> name mapping), read-only
+    KNOWN_COINS = MappingProxyType({
         "BTC": "Bitcoin",
         "ETH": "Ethereum",
         "SOL": "Solana",
@@ -47,7 +60,7 @@ class Config:
         "AVAX": "Avalanche",
         "LINK": "Chainlink",
         "UNI": "Uniswap"
-    }
+    })
     
     @classmethod
     def validate(cls):
@@ -67,3 +80,43 @@ class Config:
             raise ValueError(f"Configuration errors: {', '.join(errors)}")
         
         return True
+
+
+# Listener draining the log queue in this process (replaced after fork)
+_log_listener = None
+
+
+def configure_logging(level: int = logging.INFO):
+    """
+    Route log records through a queue drained by a background thread
+    
+    Request threads only enqueue records; formatting and the stderr write
+    happen on the listener thread. The listener is stopped (and the queue
+    flushed) at exit.
+    """
+    queue_handler = logging.handlers.QueueHandler(queue.Queue(-1))
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    
+    def start_listener():
+        global _log_listener
+        # A new queue and listener each time: a listener copied across
+        # fork has no thread and can't be restarted
+        queue_handler.queue = queue.Queue(-1)
+        _log_listener = logging.handlers.QueueListener(queue_handler.queue, stream_handler)
+        _log_listener.start()
+    
+    start_listener()
+    # Threads don't survive fork: give forked workers their own drain
+    os.register_at_fork(after_in_child=start_listener)
+    atexit.register(stop_logging)
+    
+    root = logging.getLogger()
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+
+def stop_logging():
+    """Stop this process's log listener after it has drained the queue"""
+    if _log_listener is not None:
+        _log_listener.stop()
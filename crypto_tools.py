@@ -2,15 +2,289 @@
 FreeCryptoAPI Tool Integration
 Handles API calls with automatic KB caching
 """
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from types import MappingProxyType
+import orjson
 import requests
-from typing import Dict, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
 from datetime import datetime, timedelta
+from functools import lru_cache
+
+log = logging.getLogger(__name__)
+
+
+# Static symbol -> CoinGecko coin ID mapping (demo purposes - normally would fetch list)
+COINGECKO_IDS = MappingProxyType({
+    "BTC": "bitcoin",
+    "ETH": "ethereum",
+    "SOL": "solana",
+    "ADA": "cardano",
+    "XRP": "ripple",
+    "DOT": "polkadot",
+    "MATIC": "matic-network",
+    "AVAX": "avalanche-2",
+    "LINK": "chainlink",
+    "UNI": "uniswap"
+})
+
+# TTLCache lookup states
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+# Background refreshes for stale-while-revalidate hits
+_REFRESH_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cache-refresh")
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into a single execution"""
+    
+    def __init__(self, wait_timeout: float = 10.0):
+        """
+        Args:
+            wait_timeout: Seconds a follower waits for the leader before
+                running the call itself
+        """
+        self.wait_timeout = wait_timeout
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+    
+    def do(self, key: Hashable, fn: Callable, *args) -> Any:
+        """Run fn(*args), or wait for the identical call already in flight"""
+        with self._lock:
+            future = self._inflight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = self._inflight[key] = Future()
+        
+        if not is_leader:
+            try:
+                return future.result(timeout=self.wait_timeout)
+            except FutureTimeoutError:
+                return fn(*args)
+        
+        try:
+            result = fn(*args)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+
+class TTLCache:
+    """In-process cache with a stale-while-revalidate window, bounded in size"""
+    
+    def __init__(self, ttl_seconds: float, stale_seconds: float, max_entries: int = 1024):
+        """
+        Initialize cache
+        
+        Args:
+            ttl_seconds: Age below which an entry is FRESH
+            stale_seconds: Age below which an entry is still served as STALE
+            max_entries: Most entries kept; the least recently written go first
+        """
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        # Oldest write first (set() moves keys to the end)
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable) -> Tuple[Any, str]:
+        """
+        Look up a key
+        
+        Returns:
+            (value, freshness) where freshness is FRESH, STALE or MISS
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, MISS
+        
+        stored_at, value = entry
+        age = time.monotonic() - stored_at
+        if age < self.ttl_seconds:
+            return value, FRESH
+        if age < self.stale_seconds:
+            return value, STALE
+        return None, MISS
+    
+    def set(self, key: Hashable, value: Any):
+        """Store a value, stamped with the current monotonic time"""
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = (now, value)
+            self._entries.move_to_end(key)
+            
+            # Drop entries past the stale window, then any over the size cap
+            while self._entries:
+                stored_at, _ = next(iter(self._entries.values()))
+                if now - stored_at < self.stale_seconds and len(self._entries) <= self.max_entries:
+                    break
+                self._entries.popitem(last=False)
+    
+    def begin_refresh(self, key: Hashable) -> bool:
+        """Claim the background refresh for a key (False if one is already running)"""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+    
+    def end_refresh(self, key: Hashable):
+        """Release a refresh claimed with begin_refresh"""
+        with self._lock:
+            self._refreshing.discard(key)
+
+
+class TokenBucket:
+    """Thread-safe token-bucket rate limiter with server-requested back-off"""
+    
+    def __init__(self, rate: float, capacity: int):
+        """
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum burst size
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+    
+    def acquire(self, timeout: float = 0.0) -> bool:
+        """Take one token, waiting up to timeout seconds (False if none became available)"""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now >= self._blocked_until:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return True
+                    wait_for = (1 - self._tokens) / self.rate
+                else:
+                    wait_for = self._blocked_until - now
+            
+            if now + wait_for > deadline:
+                return False
+            time.sleep(wait_for)
+    
+    def penalize(self, seconds: float):
+        """Block all callers for seconds (e.g. a 429's Retry-After) and drain the bucket"""
+        with self._lock:
+            now = time.monotonic()
+            self._blocked_until = max(self._blocked_until, now + seconds)
+            self._tokens = 0.0
+            self._updated = self._blocked_until
+
+
+def _retry_after_seconds(response, default: float = 60.0) -> float:
+    """Seconds to back off from a 429 response's Retry-After header (delta-seconds form)"""
+    try:
+        return max(0.0, float(response.headers.get("Retry-After")))
+    except (TypeError, ValueError):
+        return default
+
+
+# CoinGecko's free tier allows ~30 req/min; shared by every tool in the process
+_COINGECKO_BUCKET = TokenBucket(rate=0.5, capacity=30)
+
+
+@lru_cache(maxsize=4096)
+def _parse_iso(timestamp_str: str) -> datetime:
+    """Parse an ISO-8601 timestamp (memoized: cached KB timestamps repeat)"""
+    return datetime.fromisoformat(timestamp_str)
+
+
+@lru_cache(maxsize=4096)
+def _ymd_to_dmy(date: str) -> str:
+    """Convert YYYY-MM-DD to CoinGecko's dd-mm-yyyy (memoized: strptime is slow)"""
+    return datetime.strptime(date, "%Y-%m-%d").strftime("%d-%m-%Y")
+
+
+def _no_data() -> Dict:
+    """Tool response for a lookup that found nothing"""
+    return {
+        "success": False,
+        "data": None,
+        "source": None,
+        "timestamp": datetime.now().isoformat(),
+        "confidence": 0.0
+    }
+
+
+def _age_seconds(timestamp_str: Optional[str]) -> float:
+    """Age of an ISO-8601 timestamp in seconds (inf if missing or unparsable)"""
+    if not timestamp_str:
+        return float("inf")
+    try:
+        # .timestamp() treats naive values as local time, like datetime.now()
+        return time.time() - _parse_iso(timestamp_str).timestamp()
+    except (TypeError, ValueError):
+        return float("inf")
+
+
+def create_http_session(http2: bool = False):
+    """
+    Build a pooled HTTP session shared by all API tools
+    
+    Keeps TCP/TLS connections to the upstream APIs alive between calls
+    and retries transient upstream errors. 429s are not retried here:
+    the CoinGecko paths honour Retry-After through their TokenBucket.
+    
+    Args:
+        http2: Use an httpx client with HTTP/2 multiplexing instead of
+            requests (optional dependency: pip install "httpx[http2]").
+            It exposes the same get()/status_code/content/headers API.
+    """
+    if http2:
+        import httpx
+        
+        limits = httpx.Limits(max_connections=32, max_keepalive_connections=16)
+        return httpx.Client(
+            transport=httpx.HTTPTransport(http2=True, limits=limits, retries=2),
+            timeout=10.0
+        )
+    
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=16,
+        pool_maxsize=64,
+        max_retries=Retry(
+            total=2,
+            backoff_factor=0.2,
+            status_forcelist=[502, 503, 504]
+        )
+    )
+    session.mount("https://", adapter)
+    return session
 
 
 class FreeCryptoAPITool:
     """Tool for fetching crypto data from FreeCryptoAPI"""
     
-    def __init__(self, api_key: str, kb_manager, freshness_ttl_minutes: int = 5):
+    # Start the CoinGecko hedge if FreeCryptoAPI hasn't answered by then
+    HEDGE_DELAY_SECONDS = 0.3
+    
+    def __init__(self, api_key: str, kb_manager, freshness_ttl_minutes: int = 5,
+                 session=None):
         """
         Initialize API tool
         
@@ -18,18 +292,34 @@ class FreeCryptoAPITool:
             api_key: FreeCryptoAPI key
             kb_manager: KnowledgeBaseManager instance
             freshness_ttl_minutes: TTL for cached data
+            session: Shared HTTP session or httpx client (see create_http_session)
         """
         self.api_key = api_key
         self.base_url = "https://api.freecryptoapi.com/v1"
         self.kb = kb_manager
+        self.session = session or create_http_session()
         self.freshness_ttl = timedelta(minutes=freshness_ttl_minutes)
+        self._ttl_seconds = freshness_ttl_minutes * 60.0
+        self.memory_cache = TTLCache(
+            ttl_seconds=self._ttl_seconds,
+            stale_seconds=self._ttl_seconds * 3
+        )
+        # Fan-out pool for multi-coin queries; the semaphore caps concurrent
+        # upstream calls (CoinGecko's free tier allows ~10-30 req/min)
+        self._pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="crypto-api")
+        self._upstream_slots = threading.Semaphore(8)
+        # Separate pool for the primary/hedge calls, so fan-out tasks waiting
+        # on them can never starve it
+        self._upstream_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="crypto-upstream")
+        self._inflight = SingleFlight()
+        self._cg_bucket = _COINGECKO_BUCKET
     
     def get_crypto_data(self, symbol: str, force_refresh: bool = False) -> Dict:
         """
         Fetch current price and market cap for a cryptocurrency
         
         Args:
-            symbol: Coin symbol (e.g., "BTC", "ETH")
+            symbol: Coin symbol, any case (e.g., "BTC", "eth")
             force_refresh: If True, bypass cache and fetch from API
             
         Returns:
@@ -41,70 +331,149 @@ class FreeCryptoAPITool:
                 "confidence": float
             }
         """
-        # Step 1: Check KB cache (unless force refresh)
+        if not symbol:
+            return _no_data()
+        symbol = sys.intern(symbol.upper())
+        
+        # Step 1: Check in-memory and KB caches (unless force refresh)
         if not force_refresh:
-            cached_data = self.kb.get_cached_price_data(symbol)
-            if cached_data and self._is_fresh(cached_data.get("price_timestamp")):
-                return {
-                    "success": True,
-                    "data": {
-                        "symbol": cached_data["symbol"],
-                        "name": cached_data.get("name", "Unknown"),
-                        "price": cached_data["last_price"],
-                        "market_cap": cached_data["market_cap"],
-                        "change_24h": cached_data.get("change_24h", 0),
-                        "volume_24h": cached_data.get("volume_24h", 0),
-                        "rank": cached_data.get("rank")
-                    },
-                    "source": "Knowledge Base",
-                    "timestamp": cached_data["price_timestamp"],
-                    "confidence": 1.0
-                }
+            cached = self._get_cached(symbol)
+            if cached is not None:
+                return cached
         
-        # Step 2: Fetch from FreeCryptoAPI
-        api_response = self._fetch_from_api(symbol)
+        # Step 2: Fetch live data
+        return self._fetch_live_shared(symbol)
+    
+    def _fetch_live_shared(self, symbol: str) -> Dict:
+        """Fetch live data; concurrent callers for the same coin share one fetch"""
+        return self._inflight.do(("price", symbol), self._fetch_live, symbol)
+    
+    def _fetch_live(self, symbol: str) -> Dict:
+        """
+        Fetch from FreeCryptoAPI with a hedged CoinGecko fallback and cache the result
         
-        if api_response["success"]:
+        CoinGecko is started as soon as FreeCryptoAPI fails, or once it has
+        been pending for HEDGE_DELAY_SECONDS; the first successful answer wins.
+        """
+        primary = self._upstream_pool.submit(self._call_upstream, self._fetch_from_api, symbol)
+        try:
+            api_response = primary.result(timeout=self.HEDGE_DELAY_SECONDS)
+        except FutureTimeoutError:
+            api_response = None
+        
+        if api_response is not None and api_response["success"]:
             # Step 3: Cache result in KB
-            self._cache_to_kb(symbol, api_response["data"])
-            
-            return {
-                "success": True,
-                "data": api_response["data"],
-                "source": "FreeCryptoAPI",
-                "timestamp": datetime.now().isoformat(),
-                "confidence": 0.9
-            }
+            return self._live_response(symbol, api_response["data"], "FreeCryptoAPI")
         
-        # Step 3: FreeCryptoAPI failed, try CoinGecko as fallback
-        print(f"FreeCryptoAPI failed for {symbol}, trying CoinGecko...")
-        coingecko_response = self._fetch_from_coingecko(symbol)
+        # Step 3: FreeCryptoAPI failed or is slow, race CoinGecko against it
+        if api_response is not None:
+            log.info("FreeCryptoAPI failed for %s, trying CoinGecko...", symbol)
+        hedge = self._upstream_pool.submit(self._call_upstream, self._fetch_from_coingecko, symbol)
         
-        if coingecko_response["success"]:
-            # Cache CoinGecko result in KB
-            self._cache_to_kb(symbol, coingecko_response["data"])
-            
+        pending = {hedge} if api_response is not None else {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            # Prefer FreeCryptoAPI if both finished together
+            for future in sorted(done, key=lambda f: f is not primary):
+                response = future.result()
+                if response["success"]:
+                    source = "FreeCryptoAPI" if future is primary else "CoinGecko API"
+                    return self._live_response(symbol, response["data"], source)
+        
+        # Both APIs failed
+        return {
+            "success": False,
+            "data": None,
+            "source": None,
+            "timestamp": datetime.now().isoformat(),
+            "confidence": 0.0
+        }
+    
+    def _call_upstream(self, fetch: Callable[[str], Dict], symbol: str) -> Dict:
+        """Run an upstream fetch inside the concurrency cap"""
+        with self._upstream_slots:
+            return fetch(symbol)
+    
+    def _live_response(self, symbol: str, data: Dict, source: str) -> Dict:
+        """Cache fresh upstream data and wrap it in the tool response shape"""
+        self._cache_to_kb(symbol, data)
+        
+        return {
+            "success": True,
+            "data": data,
+            "source": source,
+            "timestamp": datetime.now().isoformat(),
+            "confidence": 0.9
+        }
+    
+    def _get_cached(self, symbol: str) -> Optional[Dict]:
+        """get_crypto_data() response served from the in-memory or KB cache, or None on a miss"""
+        cached, freshness = self.memory_cache.get(("price", symbol))
+        if freshness == FRESH:
+            return cached
+        if freshness == STALE:
+            # Serve stale data now, revalidate in the background
+            if self.memory_cache.begin_refresh(("price", symbol)):
+                _REFRESH_POOL.submit(self._refresh, symbol)
+            return cached
+        
+        cached_data = self.kb.get_cached_price_data(symbol)
+        if cached_data and self._is_fresh(cached_data.get("price_timestamp")):
             return {
                 "success": True,
-                "data": coingecko_response["data"],
-                "source": "CoinGecko API",
-                "timestamp": datetime.now().isoformat(),
-                "confidence": 0.9
-            }
-        else:
-            # Both APIs failed
-            return {
-                "success": False,
-                "data": None,
-                "source": None,
-                "timestamp": datetime.now().isoformat(),
-                "confidence": 0.0
+                "data": {
+                    "symbol": cached_data["symbol"],
+                    "name": cached_data.get("name", "Unknown"),
+                    "price": cached_data["last_price"],
+                    "market_cap": cached_data["market_cap"],
+                    "change_24h": cached_data.get("change_24h", 0),
+                    "volume_24h": cached_data.get("volume_24h", 0),
+                    "rank": cached_data.get("rank")
+                },
+                "source": "Knowledge Base",
+                "timestamp": cached_data["price_timestamp"],
+                "confidence": 1.0
             }
+        return None
+    
+    def get_crypto_data_many(self, symbols: Iterable[str]) -> Dict[str, Dict]:
+        """
+        Fetch crypto data for several coins concurrently
+        
+        Args:
+            symbols: Coin symbols, any case (duplicates are fetched once)
+            
+        Returns:
+            Dict mapping uppercased symbol -> get_crypto_data() response
+        """
+        # Cache hits are answered inline; only misses go to the network
+        results = {}
+        misses = []
+        for symbol in dict.fromkeys(sys.intern(symbol.upper()) if symbol else symbol for symbol in symbols):
+            if not symbol:
+                results[symbol] = _no_data()
+                continue
+            cached = self._get_cached(symbol)
+            if cached is not None:
+                results[symbol] = cached
+            else:
+                misses.append(symbol)
+        if not misses:
+            return results
+        
+        # HTTP calls release the GIL, so threads overlap the network waits.
+        # The calling thread fetches the first miss itself instead of idling
+        first, rest = misses[0], misses[1:]
+        futures = [self._pool.submit(self._fetch_live_shared, symbol) for symbol in rest]
+        results[first] = self._fetch_live_shared(first)
+        for symbol, future in zip(rest, futures):
+            results[symbol] = future.result()
+        return results
     
     def _fetch_from_api(self, symbol: str) -> Dict:
         """Fetch data from FreeCryptoAPI"""
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/getData",
                 params={"symbol": symbol},
                 headers={"X-API-KEY": self.api_key},
@@ -112,7 +481,7 @@ class FreeCryptoAPITool:
             )
             
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 return {
                     "success": True,
                     "data": {
@@ -128,103 +497,123 @@ class FreeCryptoAPITool:
             else:
                 return {"success": False, "data": None}
         except Exception as e:
-            print(f"FreeCryptoAPI Error: {e}")
+            log.warning("FreeCryptoAPI Error: %s", e)
             return {"success": False, "data": None}
     
     def _fetch_from_coingecko(self, symbol: str) -> Dict:
         """Fetch data from CoinGecko API as fallback"""
         try:
             # CoinGecko uses coin IDs, need to map symbols to IDs
-            symbol_to_id = {
-                "BTC": "bitcoin",
-                "ETH": "ethereum",
-                "SOL": "solana",
-                "ADA": "cardano",
-                "XRP": "ripple",
-                "DOT": "polkadot",
-                "MATIC": "matic-network",
-                "AVAX": "avalanche-2",
-                "LINK": "chainlink",
-                "UNI": "uniswap"
-            }
-            
-            coin_id = symbol_to_id.get(symbol.upper())
+            coin_id = COINGECKO_IDS.get(symbol)
             if not coin_id:
-                print(f"CoinGecko: Unknown symbol {symbol}")
+                log.info("CoinGecko: Unknown symbol %s", symbol)
                 return {"success": False, "data": None}
             
-            # CoinGecko free API endpoint
-            response = requests.get(
-                f"https://api.coingecko.com/api/v3/coins/{coin_id}",
+            if not self._cg_bucket.acquire(timeout=2):
+                log.info("CoinGecko: rate limited, skipping %s", symbol)
+                return {"success": False, "data": None}
+            
+            # /coins/markets returns just the market fields we use (~1 KB)
+            # instead of the full /coins/{id} document (tens of KB)
+            response = self.session.get(
+                "https://api.coingecko.com/api/v3/coins/markets",
                 params={
-                    "localization": "false",
-                    "tickers": "false",
-                    "community_data": "false",
-                    "developer_data": "false"
+                    "vs_currency": "usd",
+                    "ids": coin_id
                 },
                 timeout=10
             )
             
             if response.status_code == 200:
-                data = response.json()
-                market_data = data.get("market_data", {})
+                rows = orjson.loads(response.content)
+                if not rows:
+                    return {"success": False, "data": None}
+                data = rows[0]
                 
                 return {
                     "success": True,
                     "data": {
-                        "symbol": symbol.upper(),
-                        "name": data.get("name", "Unknown"),
-                        "price": float(market_data.get("current_price", {}).get("usd", 0)),
-                        "market_cap": float(market_data.get("market_cap", {}).get("usd", 0)),
-                        "change_24h": float(market_data.get("price_change_percentage_24h", 0)),
-                        "volume_24h": float(market_data.get("total_volume", {}).get("usd", 0)),
-                        "rank": int(market_data.get("market_cap_rank", 0))
+                        "symbol": symbol,
+                        "name": data.get("name") or "Unknown",
+                        "price": float(data.get("current_price") or 0),
+                        "market_cap": float(data.get("market_cap") or 0),
+                        "change_24h": float(data.get("price_change_percentage_24h") or 0),
+                        "volume_24h": float(data.get("total_volume") or 0),
+                        "rank": int(data.get("market_cap_rank") or 0)
                     }
                 }
             else:
+                if response.status_code == 429:
+                    self._cg_bucket.penalize(_retry_after_seconds(response))
                 return {"success": False, "data": None}
         except Exception as e:
-            print(f"CoinGecko API Error: {e}")
+            log.warning("CoinGecko API Error: %s", e)
             return {"success": False, "data": None}
     
+    def _refresh(self, symbol: str):
+        """Background revalidation of a stale in-memory entry"""
+        try:
+            self.get_crypto_data(symbol, force_refresh=True)
+        finally:
+            self.memory_cache.end_refresh(("price", symbol))
+    
     def _cache_to_kb(self, symbol: str, data: Dict):
-        """Cache API response to Knowledge Base"""
+        """Cache API response to Knowledge Base and the in-memory cache"""
         self.kb.update_price_data(symbol, data)
+        self.memory_cache.set(("price", symbol), {
+            "success": True,
+            "data": data,
+            "source": "Knowledge Base",
+            "timestamp": datetime.now().isoformat(),
+            "confidence": 1.0
+        })
     
     def _is_fresh(self, timestamp_str: str) -> bool:
         """Check if cached data is still fresh"""
-        if not timestamp_str:
-            return False
-        
-        try:
-            timestamp = datetime.fromisoformat(timestamp_str)
-            now = datetime.now(timestamp.tzinfo) if timestamp.tzinfo else datetime.now()
-            age = now - timestamp
-            return age < self.freshness_ttl
-        except:
-            return False
+        return _age_seconds(timestamp_str) < self._ttl_seconds
 
 
 class CryptoNewsTool:
     """Tool for fetching crypto news"""
     
-    def __init__(self, api_key: str, kb_manager, freshness_ttl_minutes: int = 60):
+    def __init__(self, api_key: str, kb_manager, freshness_ttl_minutes: int = 60,
+                 session=None):
         self.api_key = api_key
         self.base_url = "https://cryptonewsapi.com/api/v1"
         self.kb = kb_manager
+        self.session = session or create_http_session()
         self.freshness_ttl = timedelta(minutes=freshness_ttl_minutes)
+        self._ttl_seconds = freshness_ttl_minutes * 60.0
+        self.memory_cache = TTLCache(
+            ttl_seconds=self._ttl_seconds,
+            stale_seconds=self._ttl_seconds * 3
+        )
+        self._inflight = SingleFlight()
+        self._cg_bucket = _COINGECKO_BUCKET
     
     def get_news(self, symbol: str) -> Dict:
         """
         Fetch news for a cryptocurrency
         
         Args:
-            symbol: Coin symbol
+            symbol: Coin symbol, any case
             
         Returns:
             News response dict
         """
-        # Step 1: Check KB cache
+        if not symbol:
+            return _no_data()
+        symbol = sys.intern(symbol.upper())
+        
+        # Step 1: Check in-memory and KB caches
+        cached, freshness = self.memory_cache.get(("news", symbol))
+        if freshness == FRESH:
+            return cached
+        if freshness == STALE:
+            if self.memory_cache.begin_refresh(("news", symbol)):
+                _REFRESH_POOL.submit(self._refresh_news, symbol)
+            return cached
+        
         cached_news = self.kb.get_cached_news(symbol)
         if cached_news and self._is_fresh(cached_news.get("timestamp")):
             return {
@@ -235,12 +624,23 @@ class CryptoNewsTool:
                 "confidence": 1.0
             }
         
-        # Step 2: Fetch from API
+        # Step 2: Fetch from API (shared with concurrent callers)
+        return self._inflight.do(("news", symbol), self._fetch_news, symbol)
+    
+    def _refresh_news(self, symbol: str):
+        """Background revalidation of a stale in-memory news entry"""
+        try:
+            self._inflight.do(("news", symbol), self._fetch_news, symbol)
+        finally:
+            self.memory_cache.end_refresh(("news", symbol))
+    
+    def _fetch_news(self, symbol: str) -> Dict:
+        """Fetch news from CryptoNewsAPI and cache it"""
         try:
             # Placeholder for actual API call
             # using a public free news endpoint for demonstration if key fails
             # But using the configured key/url structure
-            response = requests.get(
+            response = self.session.get(
                 self.base_url + "/category",
                 params={
                     "section": "general",
@@ -252,7 +652,7 @@ class CryptoNewsTool:
             )
             
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 news_items = []
                 for item in data.get("data", [])[:3]:
                     news_items.append({
@@ -264,15 +664,23 @@ class CryptoNewsTool:
                 
                 if news_items:
                     self.kb.update_news_data(symbol, news_items)
+                    timestamp = datetime.now().isoformat()
+                    self.memory_cache.set(("news", symbol), {
+                        "success": True,
+                        "data": news_items,
+                        "source": "Knowledge Base",
+                        "timestamp": timestamp,
+                        "confidence": 1.0
+                    })
                     return {
                         "success": True,
                         "data": news_items,
                         "source": "CryptoNewsAPI",
-                        "timestamp": datetime.now().isoformat(),
+                        "timestamp": timestamp,
                         "confidence": 0.9
                     }
         except Exception as e:
-            print(f"News API Error: {e}")
+            log.warning("News API Error: %s", e)
             
         return {
             "success": False,
@@ -284,15 +692,7 @@ class CryptoNewsTool:
     
     def _is_fresh(self, timestamp_str: str) -> bool:
         """Check if cached data is still fresh (default 60 mins for news)"""
-        if not timestamp_str:
-            return False
-        try:
-            timestamp = datetime.fromisoformat(timestamp_str)
-            now = datetime.now(timestamp.tzinfo) if timestamp.tzinfo else datetime.now()
-            age = now - timestamp
-            return age < self.freshness_ttl
-        except:
-            return False
+        return _age_seconds(timestamp_str) < self._ttl_seconds
     
     def get_price(self, symbol: str) -> Dict:
         """Get only price for a cryptocurrency"""
@@ -317,54 +717,56 @@ class CryptoNewsTool:
                 "confidence": 0.0
             }
     
-    
-    # Static mapping for CoinGecko (demo purposes - normally would fetch list)
-    COINGECKO_IDS = {
-        "BTC": "bitcoin",
-        "ETH": "ethereum",
-        "SOL": "solana",
-        "ADA": "cardano",
-        "XRP": "ripple",
-        "DOT": "polkadot",
-        "MATIC": "matic-network",
-        "AVAX": "avalanche-2",
-        "LINK": "chainlink",
-        "UNI": "uniswap"
-    }
-    
     def get_history(self, symbol: str, date: str) -> Dict:
         """
         Get historical price for a date
         
         Args:
-            symbol: Coin symbol
+            symbol: Coin symbol, any case
             date: Date string (YYYY-MM-DD)
         """
-        # Step 1: Check KB cache
+        if not symbol:
+            return {"success": False, "data": None}
+        symbol = sys.intern(symbol.upper())
+        
+        # Step 1: Check in-memory and KB caches. Past prices never change,
+        # so stale entries are served without revalidation.
+        cached, freshness = self.memory_cache.get(("history", symbol, date))
+        if freshness != MISS:
+            return cached
+        
         cached = self.kb.get_price_history(symbol, date)
         if cached:
-            return {
+            result = {
                 "success": True,
-                "data": cached,
+                # KB history entries don't carry the symbol
+                "data": {**cached, "symbol": symbol},
                 "source": "Knowledge Base",
                 "confidence": 1.0
             }
+            self.memory_cache.set(("history", symbol, date), result)
+            return result
         
-        # Step 2: Fetch from CoinGecko (best for history)
-        return self._fetch_history_from_coingecko(symbol, date)
+        # Step 2: Fetch from CoinGecko (best for history), shared with concurrent callers
+        return self._inflight.do(
+            ("history", symbol, date), self._fetch_history_from_coingecko, symbol, date
+        )
     
     def _fetch_history_from_coingecko(self, symbol: str, date: str) -> Dict:
         """Fetch history from CoinGecko"""
         try:
-            coin_id = self.COINGECKO_IDS.get(symbol.upper())
+            coin_id = COINGECKO_IDS.get(symbol)
             if not coin_id:
                 return {"success": False, "data": None}
             
             # Convert YYYY-MM-DD to dd-mm-yyyy
-            dt = datetime.strptime(date, "%Y-%m-%d")
-            cg_date = dt.strftime("%d-%m-%Y")
+            cg_date = _ymd_to_dmy(date)
+            
+            if not self._cg_bucket.acquire(timeout=2):
+                log.info("CoinGecko: rate limited, skipping history for %s", symbol)
+                return {"success": False, "data": None}
             
-            response = requests.get(
+            response = self.session.get(
                 f"https://api.coingecko.com/api/v3/coins/{coin_id}/history",
                 params={
                     "date": cg_date,
@@ -374,7 +776,7 @@ class CryptoNewsTool:
             )
             
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 market_data = data.get("market_data", {})
                 
                 if not market_data:
@@ -386,21 +788,31 @@ class CryptoNewsTool:
                 # Cache to KB
                 self.kb.add_price_history(symbol, date, price, market_cap)
                 
+                history = {
+                    "date": date,
+                    "price": price,
+                    "market_cap": market_cap,
+                    "symbol": symbol
+                }
+                self.memory_cache.set(("history", symbol, date), {
+                    "success": True,
+                    "data": history,
+                    "source": "Knowledge Base",
+                    "confidence": 1.0
+                })
+                
                 return {
                     "success": True,
-                    "data": {
-                        "date": date,
-                        "price": price,
-                        "market_cap": market_cap,
-                        "symbol": symbol
-                    },
+                    "data": history,
                     "source": "CoinGecko API",
                     "confidence": 0.9
                 }
             else:
+                if response.status_code == 429:
+                    self._cg_bucket.penalize(_retry_after_seconds(response))
                 return {"success": False, "data": None}
         except Exception as e:
-            print(f"History API Error: {e}")
+            log.warning("History API Error: %s", e)
             return {"success": False, "data": None}
 
     def get_market_cap(self, symbol: str) -> Dict:
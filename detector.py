@@ -3,70 +3,171 @@ Entity and Intent Detection
 Detects crypto entities and classifies user intents
 """
 import re
+import sys
+import threading
+from functools import lru_cache
 from typing import Tuple, Optional, Dict
 
+try:
+    import ahocorasick
+except ImportError:  # optional: pip install pyahocorasick
+    ahocorasick = None
+
+try:
+    import hyperscan
+except ImportError:  # optional (Linux x86-64): pip install hyperscan
+    hyperscan = None
+
+# Entity confidence by how the coin was matched
+SYMBOL_CONFIDENCE = 1.0
+NAME_CONFIDENCE = 0.95
+
+
+# Tokens of the lowercased query that can be ticker symbols
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+@lru_cache(maxsize=8)
+def _compile_coin_patterns(coins: Tuple[Tuple[str, str], ...]):
+    """
+    Compile symbol/name lookup tables once per known-coins mapping
+    
+    Symbols are matched as whole query tokens (set lookup), so "ADA" is not
+    found inside "Canada". Names, which may span several words, are found
+    by a single Aho-Corasick automaton over the lowercased query when
+    pyahocorasick is installed, and by a regex alternation otherwise.
+    
+    Returns:
+        (canonical symbols in KB order (uppercased, interned),
+         lowercase symbol -> canonical symbol,
+         automaton mapping lowercase name -> (symbol, confidence), or None,
+         name regex over the lowercased query,
+         lowercase name -> canonical symbol)
+    """
+    symbols = tuple(sys.intern(symbol.upper()) for symbol, _ in coins)
+    name_to_symbol = {name.lower(): symbol for symbol, (_, name) in zip(symbols, coins)}
+    
+    automaton = None
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for name, symbol in name_to_symbol.items():
+            automaton.add_word(name, (symbol, NAME_CONFIDENCE))
+        automaton.make_automaton()
+    
+    # Longest first so overlapping alternatives prefer the full name
+    name_re = re.compile("|".join(
+        re.escape(name) for name in sorted(name_to_symbol, key=len, reverse=True)
+    ))
+    
+    return (
+        symbols,
+        {symbol.lower(): symbol for symbol in symbols},
+        automaton,
+        name_re,
+        name_to_symbol
+    )
+
+
+@lru_cache(maxsize=4)
+def _compile_rejection_db(patterns: Tuple[str, ...]):
+    """Compile rejection patterns into one Hyperscan block-mode database (None without hyperscan)"""
+    if hyperscan is None:
+        return None
+    
+    db = hyperscan.Database()
+    try:
+        db.compile(
+            expressions=[pattern.encode("utf-8") for pattern in patterns],
+            ids=list(range(len(patterns))),
+            flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH] * len(patterns)
+        )
+    except hyperscan.error:
+        # e.g. a CPU without SSSE3: stay on the stdlib regex
+        return None
+    return db
+
+
+def _stop_at_first_match(pattern_id, start, end, flags, matched):
+    """Hyperscan match callback: record the hit and stop scanning"""
+    matched.append(pattern_id)
+    return True
+
 
 class EntityDetector:
     """Detects cryptocurrency entities in user queries"""
     
-    def __init__(self, known_coins: dict, memory):
+    def __init__(self, known_coins: dict, memory=None):
         """
         Initialize entity detector
         
         Args:
             known_coins: Dict mapping symbols to coin names
-            memory: ConversationMemory instance
+            memory: Default ConversationMemory instance (can be overridden per call)
         """
         self.known_coins = known_coins
         self.memory = memory
+        (self._symbols, self._symbol_by_lower, self._automaton,
+         self._name_re, self._name_to_symbol) = _compile_coin_patterns(tuple(known_coins.items()))
+        self._kb_order = {symbol: index for index, symbol in enumerate(self._symbols)}
     
     
-    def detect_entity(self, query: str) -> Tuple[Optional[str], float]:
+    def detect_entity(self, query: str, memory=None) -> Tuple[Optional[str], float]:
         """
         Detect entity with memory-based pronoun resolution (Backwards compatibility)
         Returns primary/first entity.
         """
-        entities = self.detect_entities(query)
+        entities = self.detect_entities(query, memory)
         if entities:
             return entities[0]
         return None, 0.0
 
-    def detect_entities(self, query: str) -> list[Tuple[str, float]]:
+    def _find_coins(self, query_lower: str) -> Dict[str, float]:
+        """Scan the query once; returns symbol -> best match confidence"""
+        hits = {}
+        if self._automaton is not None:
+            for _, (symbol, confidence) in self._automaton.iter(query_lower):
+                hits[symbol] = confidence
+        else:
+            for name in self._name_re.findall(query_lower):
+                hits[self._name_to_symbol[name]] = NAME_CONFIDENCE
+        
+        # Symbols last: a ticker match outranks a name match. The set
+        # intersection runs the per-token lookups in C
+        for token in self._symbol_by_lower.keys() & _TOKEN_RE.findall(query_lower):
+            hits[self._symbol_by_lower[token]] = SYMBOL_CONFIDENCE
+        return hits
+
+    def detect_entities(self, query: str, memory=None,
+                        query_lower: Optional[str] = None) -> list[Tuple[str, float]]:
         """
         Detect ALL unique entities in query
         
+        Args:
+            query: User query
+            memory: ConversationMemory used for pronoun resolution
+                (defaults to the one given at construction)
+            query_lower: query.lower(), if the caller already has it
+        
         Returns:
-            List of (symbol, confidence)
+            List of (symbol, confidence); symbols are uppercased and interned
         """
-        entities = []
-        found_symbols = set()
+        if query_lower is None:
+            query_lower = query.lower()
         
-        # 1. Check for explicit symbols
-        for symbol in self.known_coins.keys():
-            if symbol in query.upper():
-                if symbol not in found_symbols:
-                    entities.append((symbol, 1.0))
-                    found_symbols.add(symbol)
-        
-        # 2. Check for coin names
-        query_lower = query.lower()
-        for symbol, name in self.known_coins.items():
-            if name.lower() in query_lower:
-                if symbol not in found_symbols:
-                    entities.append((symbol, 0.95))
-                    found_symbols.add(symbol)
+        # 1-2. Explicit symbols, then coin names, each in KB order
+        hits = self._find_coins(query_lower)
+        entities = sorted(hits.items(), key=lambda hit: (-hit[1], self._kb_order[hit[0]]))
         
         # 3. Check for pronouns (only if no entities found or single entity context)
         # Note: Handling pronouns in multi-entity context is complex, so we limit it.
-        if not entities:
-            resolved_entity = self.memory.resolve_pronoun(query)
+        memory = memory if memory is not None else self.memory
+        if not entities and memory is not None:
+            resolved_entity = memory.resolve_pronoun(query)
             if resolved_entity:
-                entities.append((resolved_entity, 0.85))
+                # Matched symbols are already canonical; memory may hold anything
+                entities.append((sys.intern(resolved_entity.upper()), 0.85))
                 
         return entities
-        
-        # 4. No entity detected
-        return None, 0.0
 
 
 class IntentClassifier:
@@ -83,96 +184,157 @@ class IntentClassifier:
         # Price targets
         r'\b(reach|hit|get to|moon|crash|dump|pump)\b.*\$\d+',
     ]
+    # All rejection patterns as one alternation: a single scan per query
+    REJECTION_RE = re.compile("|".join(f"(?:{pattern})" for pattern in REJECTION_PATTERNS))
+    
+    # Allowed intents in precedence order: (intent, confidence, keywords)
+    INTENT_KEYWORDS = (
+        ("comparison", 0.95, ('compare', 'vs', 'versus', 'difference', 'better', 'against', 'or')),
+        ("price_history", 0.95, ('yesterday', 'last week', 'last month', 'ago', 'history', 'historical', 'was the price', 'price was', 'price on')),
+        ("price", 0.95, ('price', 'cost', 'how much', 'worth', 'value', 'trading at')),
+        ("market_cap", 0.95, ('market cap', 'marketcap', 'market capitalization', 'mcap', 'market value')),
+        ("news", 0.95, ('news', 'headline', 'headlines', 'latest', 'recent', 'update', 'happening')),
+        ("metadata", 0.90, ('what is', 'what\'s', 'tell me about', 'explain', 'describe', 'info', 'information', 'consensus', 'launch', 'creator', 'created')),
+    )
     
-    def classify_intent(self, query: str, has_entity: bool) -> Tuple[str, float]:
+    # Follow-up indicators: whole words ("it" must not match "bitcoin") and phrases
+    FOLLOW_UP_WORDS = frozenset({'it', 'its', 'this', 'that', 'and'})
+    FOLLOW_UP_PHRASES = ('what about', 'how about')
+    # Same tokenization as ConversationMemory.resolve_pronoun: "it's" -> "it", "s"
+    WORD_RE = re.compile(r"\w+")
+    
+    def __init__(self):
+        # Rejection patterns as one Hyperscan database when available;
+        # scratch space is per thread (a scan must not share it)
+        self._rejection_db = _compile_rejection_db(tuple(self.REJECTION_PATTERNS))
+        self._scratch = threading.local()
+        
+        # One automaton over every intent keyword (payload: precedence rank)
+        self._keyword_ac = None
+        if ahocorasick is not None:
+            self._keyword_ac = ahocorasick.Automaton()
+            for rank in reversed(range(len(self.INTENT_KEYWORDS))):
+                # Reverse order: a keyword shared by two groups keeps the higher precedence
+                for keyword in self.INTENT_KEYWORDS[rank][2]:
+                    self._keyword_ac.add_word(keyword, rank)
+            self._keyword_ac.make_automaton()
+    
+    def classify_intent(self, query: str, has_entity: bool,
+                        query_lower: Optional[str] = None) -> Tuple[str, float]:
         """
         Classify user intent
         
         Args:
             query: User query
             has_entity: Whether an entity was detected
+            query_lower: query.lower(), if the caller already has it
             
         Returns:
             (intent, confidence)
         """
-        query_lower = query.lower()
+        if query_lower is None:
+            query_lower = query.lower()
         
         # 1. Check for rejected intents FIRST
-        for pattern in self.REJECTION_PATTERNS:
-            if re.search(pattern, query_lower):
-                return "REJECTED", 1.0
+        if self.is_rejected(query_lower):
+            return "REJECTED", 1.0
         
         # 2. Classify allowed intents
+        return self.classify_allowed_intent(query_lower, has_entity)
+    
+    def classify_allowed_intent(self, query_lower: str, has_entity: bool) -> Tuple[str, float]:
+        """
+        Classify a query already known not to be rejected (no rejection scan)
         
-        # Helper for keywords
-             
-        # Comparison intent
-        if self._matches_keywords(query_lower, ['compare', 'vs', 'versus', 'difference', 'better', 'against', 'or']):
-            return "comparison", 0.95
-
-        # Price history intent
-        if self._matches_keywords(query_lower, ['yesterday', 'last week', 'last month', 'ago', 'history', 'historical', 'was the price', 'price was', 'price on']):
-            return "price_history", 0.95
+        Args:
+            query_lower: Lowercased user query
+            has_entity: Whether an entity was detected
             
-        # Price intent
-        if self._matches_keywords(query_lower, ['price', 'cost', 'how much', 'worth', 'value', 'trading at']):
-            return "price", 0.95
-        
-        # Market cap intent
-        if self._matches_keywords(query_lower, ['market cap', 'marketcap', 'market capitalization', 'mcap', 'market value']):
-            return "market_cap", 0.95
-        
-        # News intent
-        if self._matches_keywords(query_lower, ['news', 'headline', 'headlines', 'latest', 'recent', 'update', 'happening']):
-            return "news", 0.95
-        
-        # Metadata intent
-        if self._matches_keywords(query_lower, ['what is', 'what\'s', 'tell me about', 'explain', 'describe', 'info', 'information', 'consensus', 'launch', 'creator', 'created']):
-            return "metadata", 0.90
+        Returns:
+            (intent, confidence)
+        """
+        # First matching keyword group wins
+        rank = self._keyword_rank(query_lower)
+        if rank < len(self.INTENT_KEYWORDS):
+            intent, confidence, _ = self.INTENT_KEYWORDS[rank]
+            return intent, confidence
         
         # Follow-up intent
-        if self._is_follow_up(query_lower) and has_entity:
+        if has_entity and self._is_follow_up(query_lower):
             return "follow_up", 0.80
         
         # Unknown intent
         return "unknown", 0.0
     
-    def _matches_keywords(self, query: str, keywords: list) -> bool:
+    def is_rejected(self, query_lower: str) -> bool:
+        """Check the lowercased query against REJECTION_PATTERNS in a single scan"""
+        # Hyperscan's \b is ASCII-only (and unsupported in its UCP mode), so
+        # non-ASCII queries use the regex to keep Unicode word boundaries
+        if self._rejection_db is None or not query_lower.isascii():
+            return self.REJECTION_RE.search(query_lower) is not None
+        
+        scratch = getattr(self._scratch, "scratch", None)
+        if scratch is None:
+            scratch = self._scratch.scratch = hyperscan.Scratch(self._rejection_db)
+        
+        matched = []
+        try:
+            self._rejection_db.scan(
+                query_lower.encode("utf-8"),
+                match_event_handler=_stop_at_first_match,
+                context=matched,
+                scratch=scratch
+            )
+        except hyperscan.ScanTerminated:
+            pass
+        return bool(matched)
+    
+    def _keyword_rank(self, query: str) -> int:
+        """
+        Precedence rank of the first keyword group found in the query
+        
+        Returns:
+            Index into INTENT_KEYWORDS, or len(INTENT_KEYWORDS) if nothing matched
+        """
+        if self._keyword_ac is None:
+            for rank, (_, _, keywords) in enumerate(self.INTENT_KEYWORDS):
+                if self._matches_keywords(query, keywords):
+                    return rank
+            return len(self.INTENT_KEYWORDS)
+        
+        best = len(self.INTENT_KEYWORDS)
+        for _, rank in self._keyword_ac.iter(query):
+            if rank < best:
+                best = rank
+                if best == 0:
+                    break
+        return best
+    
+    def _matches_keywords(self, query: str, keywords) -> bool:
         """Check if query contains any of the keywords"""
         return any(keyword in query for keyword in keywords)
     
     def _is_follow_up(self, query: str) -> bool:
         """Check if query is a follow-up question"""
-        follow_up_indicators = [
-            'it', 'its', 'this', 'that', 'what about', 'how about', 'and'
-        ]
-        return any(indicator in query for indicator in follow_up_indicators)
+        if not self.FOLLOW_UP_WORDS.isdisjoint(self.WORD_RE.findall(query)):
+            return True
+        return self._matches_keywords(query, self.FOLLOW_UP_PHRASES)
 
 
 class CryptoQueryDetector:
     """Combined entity and intent detection system"""
     
-    def __init__(self, known_coins: dict, memory):
+    def __init__(self, known_coins: dict, memory=None):
         self.entity_detector = EntityDetector(known_coins, memory)
         self.intent_classifier = IntentClassifier()
     
-    def detect(self, query: str) -> Dict:
+    def detect(self, query: str, memory=None) -> Dict:
         """
         Detect entity and intent from query
         
-        Returns:
-            {
-                "detected_entity": str or None,
-                "detected_intent": str,
-                "entity_confidence": float,
-                "intent_confidence": float,
-                "overall_confidence": float,
-                "should_reject": bool
-            }
-        """
-    def detect(self, query: str) -> Dict:
-        """
-        Detect entity and intent from query
+        Args:
+            query: User query
+            memory: Session ConversationMemory for pronoun resolution
         
         Returns:
             {
@@ -185,20 +347,37 @@ class CryptoQueryDetector:
                 "should_reject": bool
             }
         """
+        # Case-fold once for both detectors. str.lower() has its own ASCII
+        # fast path; an encode/bytes.translate/decode round-trip is slower
+        query_lower = query.lower()
+        
+        # Rejected queries are answered without an entity: skip the entity scan
+        if self.intent_classifier.is_rejected(query_lower):
+            return {
+                "detected_entity": None,
+                "detected_entities": [],
+                "detected_intent": "REJECTED",
+                "entity_confidence": 0.0,
+                "intent_confidence": 1.0,
+                "overall_confidence": 1.0,
+                "should_reject": True
+            }
+        
         # Detect entities
-        entities = self.entity_detector.detect_entities(query)
+        # Symbols leave the detector uppercased and interned, so downstream
+        # tools and caches can use them as-is
+        entities = self.entity_detector.detect_entities(query, memory, query_lower=query_lower)
         primary_entity = entities[0][0] if entities else None
         entity_conf = entities[0][1] if entities else 0.0
         
-        # Classify intent
-        intent, intent_conf = self.intent_classifier.classify_intent(query, has_entity=(len(entities) > 0))
+        # Classify intent (the rejection scan above already passed)
+        intent, intent_conf = self.intent_classifier.classify_allowed_intent(
+            query_lower, has_entity=(len(entities) > 0)
+        )
         
         # Calculate overall confidence
         overall_conf = min(entity_conf, intent_conf) if entities else intent_conf
         
-        # Determine if should reject
-        should_reject = (intent == "REJECTED")
-        
         return {
             "detected_entity": primary_entity,
             "detected_entities": [e[0] for e in entities],
@@ -206,5 +385,5 @@ class CryptoQueryDetector:
             "entity_confidence": entity_conf,
             "intent_confidence": intent_conf,
             "overall_confidence": overall_conf,
-            "should_reject": should_reject
+            "should_reject": False
         }
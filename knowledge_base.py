@@ -2,51 +2,131 @@
 Knowledge Base Manager for Crypto Assistant
 Handles KB operations including metadata queries and price caching
 """
-import json
+import atexit
+import logging
 import os
+import sys
+import tempfile
+import threading
+import time
+import orjson
 from typing import Dict, Optional, List
 from datetime import datetime
+from functools import lru_cache
+
+log = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1)
+def _iso_for_second(second: int) -> str:
+    return datetime.fromtimestamp(second).isoformat()
+
+
+def _now_iso() -> str:
+    """Current local time as ISO-8601, second precision (formatted once per second)"""
+    return _iso_for_second(int(time.time()))
 
 
 class KnowledgeBaseManager:
     """Manages Knowledge Base operations"""
     
-    def __init__(self, kb_file_path: str):
+    def __init__(self, kb_file_path: str, flush_delay_seconds: float = 2.0):
         """
         Initialize KB manager
         
         Args:
             kb_file_path: Path to JSON KB file
+            flush_delay_seconds: Updates within this window are written to
+                disk together (see flush)
         """
         self.kb_path = kb_file_path
         self.kb_data = self._load_kb()
+        # API tools update the KB from worker threads
+        self._lock = threading.RLock()
+        # Mutations only mark the KB dirty; a timer writes it once per window
+        self.flush_delay_seconds = flush_delay_seconds
+        self._dirty = False
+        self._flush_timer = None
+        self._write_lock = threading.Lock()
+        atexit.register(self.flush)
+        # symbol -> coin dict (same objects as in kb_data["coins"]; first entry wins)
+        self._by_symbol = {}
+        # symbol -> {date: history entry} (entries shared with coin["history"];
+        # kept outside the coin dicts so it is never written to disk)
+        self._history_by_date = {}
+        # symbol -> projected dicts returned by the getters (shared, read-only
+        # for callers); price views are dropped whenever prices change
+        self._metadata_views = {}
+        self._price_views = {}
+        for coin in self.kb_data.get("coins", []):
+            symbol = coin.get("symbol")
+            if symbol in self._by_symbol:
+                continue
+            self._by_symbol[symbol] = coin
+            history = self._history_by_date[symbol] = {}
+            for entry in coin.get("history", []):
+                history.setdefault(entry.get("date"), entry)
     
     def _load_kb(self) -> Dict:
         """Load KB from file"""
         try:
             if os.path.exists(self.kb_path):
-                with open(self.kb_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                with open(self.kb_path, 'rb') as f:
+                    kb_data = orjson.loads(f.read())
+                # Interned symbols match the detector's interned strings by identity,
+                # the fast path for the _by_symbol lookups (orjson already caches keys)
+                for coin in kb_data.get("coins", []):
+                    if isinstance(coin.get("symbol"), str):
+                        coin["symbol"] = sys.intern(coin["symbol"])
+                return kb_data
             else:
                 # Create empty KB if doesn't exist
                 return {"metadata_version": "1.0", "coins": []}
         except Exception as e:
-            print(f"Error loading KB: {e}")
+            log.error("Error loading KB: %s", e)
             return {"metadata_version": "1.0", "coins": []}
     
     def _save_kb(self):
-        """Save KB to file"""
-        try:
-            # Ensure directory exists
-            os.makedirs(os.path.dirname(self.kb_path), exist_ok=True)
-            
-            with open(self.kb_path, 'w', encoding='utf-8') as f:
-                json.dump(self.kb_data, f, indent=2, ensure_ascii=False)
+        """Schedule a write of the KB (debounced, see flush)"""
+        with self._lock:
+            self._dirty = True
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.flush_delay_seconds, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+    
+    def flush(self):
+        """Write pending KB changes to file (atomically, via a temp file + rename)"""
+        with self._write_lock:
+            with self._lock:
+                if self._flush_timer is not None:
+                    self._flush_timer.cancel()
+                    self._flush_timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+                # Stamp before serializing so the file carries this write's time
+                self.kb_data["last_updated"] = _now_iso()
+                # Compact on disk (machine-read); `python knowledge_base.py pretty` re-indents
+                payload = orjson.dumps(self.kb_data, option=orjson.OPT_NON_STR_KEYS)
             
-            # Update last_updated timestamp
-            self.kb_data["last_updated"] = datetime.now().isoformat()
-        except Exception as e:
-            print(f"Error saving KB: {e}")
+            tmp_path = None
+            try:
+                # Ensure directory exists
+                kb_dir = os.path.dirname(self.kb_path)
+                os.makedirs(kb_dir, exist_ok=True)
+                
+                with tempfile.NamedTemporaryFile('wb', dir=kb_dir, suffix='.tmp', delete=False) as f:
+                    tmp_path = f.name
+                    f.write(payload)
+                os.replace(tmp_path, self.kb_path)
+            except Exception as e:
+                log.error("Error saving KB: %s", e)
+                # Keep the changes pending for the next flush
+                with self._lock:
+                    self._dirty = True
+                if tmp_path is not None and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
     
     def get_coin_metadata(self, symbol: str) -> Optional[Dict]:
         """
@@ -56,21 +136,27 @@ class KnowledgeBaseManager:
             symbol: Coin symbol (e.g., "BTC")
             
         Returns:
-            Metadata dict or None
+            Metadata dict (shared; do not modify) or None
         """
-        for coin in self.kb_data.get("coins", []):
-            if coin.get("symbol") == symbol:
-                return {
-                    "coin": coin.get("coin"),
-                    "symbol": coin.get("symbol"),
-                    "description": coin.get("description"),
-                    "launch_year": coin.get("launch_year"),
-                    "consensus": coin.get("consensus"),
-                    "chain_type": coin.get("chain_type"),
-                    "creator": coin.get("creator"),
-                    "max_supply": coin.get("max_supply")
-                }
-        return None
+        view = self._metadata_views.get(symbol)
+        if view is not None:
+            return view
+        
+        coin = self._by_symbol.get(symbol)
+        if coin is None:
+            return None
+        
+        view = self._metadata_views[symbol] = {
+            "coin": coin.get("coin"),
+            "symbol": coin.get("symbol"),
+            "description": coin.get("description"),
+            "launch_year": coin.get("launch_year"),
+            "consensus": coin.get("consensus"),
+            "chain_type": coin.get("chain_type"),
+            "creator": coin.get("creator"),
+            "max_supply": coin.get("max_supply")
+        }
+        return view
     
     def get_cached_price_data(self, symbol: str) -> Optional[Dict]:
         """
@@ -80,23 +166,31 @@ class KnowledgeBaseManager:
             symbol: Coin symbol
             
         Returns:
-            Price data dict or None
+            Price data dict (shared; do not modify) or None
         """
-        for coin in self.kb_data.get("coins", []):
-            if coin.get("symbol") == symbol:
-                # Only return if price data exists
-                if coin.get("last_price") is not None:
-                    return {
-                        "symbol": coin.get("symbol"),
-                        "name": coin.get("coin"),
-                        "last_price": coin.get("last_price"),
-                        "market_cap": coin.get("market_cap"),
-                        "price_timestamp": coin.get("price_timestamp"),
-                        "change_24h": coin.get("change_24h", 0),
-                        "volume_24h": coin.get("volume_24h", 0),
-                        "rank": coin.get("rank")
-                    }
-        return None
+        view = self._price_views.get(symbol)
+        if view is not None:
+            return view
+        
+        # Built under the lock so it can't mix fields from before and after
+        # an update_price_data() or be stored after that update drops it
+        with self._lock:
+            coin = self._by_symbol.get(symbol)
+            # Only return if price data exists
+            if coin is None or coin.get("last_price") is None:
+                return None
+            
+            view = self._price_views[symbol] = {
+                "symbol": coin.get("symbol"),
+                "name": coin.get("coin"),
+                "last_price": coin.get("last_price"),
+                "market_cap": coin.get("market_cap"),
+                "price_timestamp": coin.get("price_timestamp"),
+                "change_24h": coin.get("change_24h", 0),
+                "volume_24h": coin.get("volume_24h", 0),
+                "rank": coin.get("rank")
+            }
+            return view
     
     def update_price_data(self, symbol: str, price_data: Dict):
         """
@@ -106,38 +200,43 @@ class KnowledgeBaseManager:
             symbol: Coin symbol
             price_data: Price data from API
         """
-        # Find existing coin
-        for coin in self.kb_data.get("coins", []):
-            if coin.get("symbol") == symbol:
+        with self._lock:
+            # Find existing coin
+            coin = self._by_symbol.get(symbol)
+            if coin is not None:
                 # Update price fields
                 coin["last_price"] = price_data.get("price")
                 coin["market_cap"] = price_data.get("market_cap")
-                coin["price_timestamp"] = datetime.now().isoformat()
+                coin["price_timestamp"] = _now_iso()
                 coin["change_24h"] = price_data.get("change_24h", 0)
                 coin["volume_24h"] = price_data.get("volume_24h", 0)
                 coin["rank"] = price_data.get("rank")
+                # Views are rebuilt under the same lock, so the next one sees the new fields
+                self._price_views.pop(symbol, None)
                 self._save_kb()
                 return
         
-        # Coin not in KB, add it (with minimal metadata)
-        new_coin = {
-            "coin": price_data.get("name", "Unknown"),
-            "symbol": symbol,
-            "description": None,
-            "launch_year": None,
-            "consensus": None,
-            "chain_type": None,
-            "creator": None,
-            "max_supply": None,
-            "last_price": price_data.get("price"),
-            "market_cap": price_data.get("market_cap"),
-            "price_timestamp": datetime.now().isoformat(),
-            "change_24h": price_data.get("change_24h", 0),
-            "volume_24h": price_data.get("volume_24h", 0),
-            "rank": price_data.get("rank")
-        }
-        self.kb_data["coins"].append(new_coin)
-        self._save_kb()
+            # Coin not in KB, add it (with minimal metadata)
+            new_coin = {
+                "coin": price_data.get("name", "Unknown"),
+                "symbol": symbol,
+                "description": None,
+                "launch_year": None,
+                "consensus": None,
+                "chain_type": None,
+                "creator": None,
+                "max_supply": None,
+                "last_price": price_data.get("price"),
+                "market_cap": price_data.get("market_cap"),
+                "price_timestamp": _now_iso(),
+                "change_24h": price_data.get("change_24h", 0),
+                "volume_24h": price_data.get("volume_24h", 0),
+                "rank": price_data.get("rank")
+            }
+            self.kb_data["coins"].append(new_coin)
+            self._by_symbol[symbol] = new_coin
+            self._history_by_date[symbol] = {}
+            self._save_kb()
     
     def get_cached_news(self, symbol: str) -> Optional[Dict]:
         """
@@ -149,10 +248,9 @@ class KnowledgeBaseManager:
         Returns:
             News dict or None
         """
-        for coin in self.kb_data.get("coins", []):
-            if coin.get("symbol") == symbol:
-                if coin.get("news"):
-                    return coin["news"]
+        coin = self._by_symbol.get(symbol)
+        if coin and coin.get("news"):
+            return coin["news"]
         return None
     
     def update_news_data(self, symbol: str, news_items: List[Dict]):
@@ -163,14 +261,14 @@ class KnowledgeBaseManager:
             symbol: Coin symbol
             news_items: List of news items
         """
-        for coin in self.kb_data.get("coins", []):
-            if coin.get("symbol") == symbol:
+        with self._lock:
+            coin = self._by_symbol.get(symbol)
+            if coin is not None:
                 coin["news"] = {
                     "items": news_items,
-                    "timestamp": datetime.now().isoformat()
+                    "timestamp": _now_iso()
                 }
                 self._save_kb()
-                return
     
     
     def get_price_history(self, symbol: str, date: str) -> Optional[Dict]:
@@ -181,37 +279,54 @@ class KnowledgeBaseManager:
             symbol: Coin symbol
             date: Date string (YYYY-MM-DD)
         """
-        for coin in self.kb_data.get("coins", []):
-            if coin.get("symbol") == symbol:
-                for entry in coin.get("history", []):
-                    if entry.get("date") == date:
-                        return entry
-        return None
+        return self._history_by_date.get(symbol, {}).get(date)
 
     def add_price_history(self, symbol: str, date: str, price: float, market_cap: float):
         """Add price history entry"""
-        for coin in self.kb_data.get("coins", []):
-            if coin.get("symbol") == symbol:
-                if "history" not in coin:
-                    coin["history"] = []
-                
-                # Check if exists to update or append
-                for entry in coin["history"]:
-                    if entry.get("date") == date:
-                        entry["price"] = price
-                        entry["market_cap"] = market_cap
-                        self._save_kb()
-                        return
-                
-                # Append new
-                coin["history"].append({
-                    "date": date,
-                    "price": price,
-                    "market_cap": market_cap
-                })
+        with self._lock:
+            coin = self._by_symbol.get(symbol)
+            if coin is None:
+                return
+            
+            # Check if exists to update or append
+            history = self._history_by_date[symbol]
+            entry = history.get(date)
+            if entry is not None:
+                entry["price"] = price
+                entry["market_cap"] = market_cap
                 self._save_kb()
                 return
+            
+            # Append new
+            entry = history[date] = {
+                "date": date,
+                "price": price,
+                "market_cap": market_cap
+            }
+            coin.setdefault("history", []).append(entry)
+            self._save_kb()
 
     def get_all_coins(self) -> List[str]:
         """Get list of all coin symbols in KB"""
         return [coin.get("symbol") for coin in self.kb_data.get("coins", [])]
+    
+    def coin_count(self) -> int:
+        """Number of coins in KB (without building the symbol list)"""
+        return len(self.kb_data.get("coins", []))
+
+
+if __name__ == '__main__':
+    import argparse
+    
+    from config import Config
+    
+    parser = argparse.ArgumentParser(description="Knowledge Base file tools")
+    parser.add_argument("command", choices=["pretty"], help="pretty: re-indent the KB file for reading/editing")
+    parser.add_argument("path", nargs="?", default=Config.KB_FILE_PATH, help="KB file (default: Config.KB_FILE_PATH)")
+    args = parser.parse_args()
+    
+    with open(args.path, 'rb') as f:
+        data = orjson.loads(f.read())
+    with open(args.path, 'wb') as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    print(f"Pretty-printed {args.path}")
@@ -2,10 +2,24 @@
 LLM Orchestrator with strict hallucination prevention
 Uses OpenAI for natural language understanding and response formatting
 """
+import logging
+import re
+import threading
+from collections import OrderedDict
 from openai import OpenAI
-from typing import Dict, Optional, Any
+from typing import Any, Callable, Dict, Iterator, Optional, Union
 from datetime import datetime
 
+try:
+    from dateparser.search import search_dates
+except ImportError:  # dates are then extracted by the LLM only
+    search_dates = None
+
+log = logging.getLogger(__name__)
+
+# Explicit YYYY-MM-DD dates in a query (dateparser's search skips these)
+_ISO_DATE_RE = re.compile(r"\b\d{4}-\d{2}-\d{2}\b")
+
 
 class LLMOrchestrator:
     """LLM-based orchestration with strict constraints"""
@@ -38,16 +52,111 @@ EXAMPLES OF WHAT YOU CAN DO:
 
 REMEMBER: You are a DATA FORMATTER, not a knowledge source."""
     
-    def __init__(self, api_key: str):
-        """Initialize LLM orchestrator"""
+    # Shared, never-mutated system messages: every request starts with the
+    # same bytes, which keeps the prompt prefix cacheable upstream
+    SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT}
+    
+    DATE_SYSTEM_MESSAGE = {"role": "system", "content": "You are a date extractor. Extract the target date from the user query in YYYY-MM-DD format, using the date given as today. If date is relative (yesterday, last week, 3 days ago), calculate it. Return ONLY the date string (YYYY-MM-DD) with no other text. If no specific date found, or the query gives only a month or a year, return 'None'."}
+    
+    def __init__(self, api_key: str, cache_size: int = 1024):
+        """
+        Initialize LLM orchestrator
+        
+        Args:
+            api_key: OpenAI API key
+            cache_size: Number of completions kept in the LRU response cache
+        """
         self.client = OpenAI(api_key=api_key)
         self.model = "gpt-3.5-turbo"
+        # (model, temperature, max_tokens, messages) -> completion text.
+        # Prompts embed the data being formatted, so new prices/news/dates
+        # produce new keys and never hit a stale entry
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+    
+    def _cache_key(self, messages: list, temperature: float, max_tokens: int) -> tuple:
+        return (
+            self.model, temperature, max_tokens,
+            tuple((m["role"], m["content"]) for m in messages)
+        )
+    
+    def _cache_get(self, key: tuple) -> Optional[str]:
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+            return cached
+    
+    def _cache_put(self, key: tuple, content: str):
+        with self._cache_lock:
+            self._cache[key] = content
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+    
+    def _complete(self, messages: list, temperature: float, max_tokens: int) -> str:
+        """Run a chat completion, answering repeated identical prompts from the cache"""
+        key = self._cache_key(messages, temperature, max_tokens)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        content = response.choices[0].message.content.strip()
+        
+        self._cache_put(key, content)
+        return content
+    
+    def _stream(self, messages: list, temperature: float, max_tokens: int,
+                fallback: Callable[[], str]) -> Iterator[str]:
+        """
+        Streaming variant of _complete: yields text chunks as the model produces them
+        
+        Cached prompts are yielded in one chunk. If the call fails before
+        any text was produced, fallback() is yielded instead.
+        """
+        key = self._cache_key(messages, temperature, max_tokens)
+        cached = self._cache_get(key)
+        if cached is not None:
+            yield cached
+            return
+        
+        parts = []
+        try:
+            chunks = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True
+            )
+            for chunk in chunks:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta and not parts:
+                    delta = delta.lstrip()
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        except Exception as e:
+            log.warning("LLM Error: %s", e)
+            if not parts:
+                yield fallback()
+            return
+        
+        self._cache_put(key, "".join(parts).strip())
     
-    def format_metadata_response(self, metadata: Dict) -> str:
-        """Format metadata into natural language"""
+    def format_metadata_response(self, metadata: Dict, stream: bool = False) -> Union[str, Iterator[str]]:
+        """Format metadata into natural language (text chunks if stream)"""
         try:
             messages = [
-                {"role": "system", "content": self.SYSTEM_PROMPT},
+                self.SYSTEM_MESSAGE,
                 {"role": "user", "content": f"""Format this cryptocurrency metadata into a natural, friendly response:
 
 Coin: {metadata.get('coin')}
@@ -61,21 +170,18 @@ Creator: {metadata.get('creator')}
 Format it as a brief, informative paragraph. Do NOT add any information beyond what's provided."""}
             ]
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=0.3,
-                max_tokens=200
-            )
-            
-            return response.choices[0].message.content.strip()
+            if stream:
+                return self._stream(messages, temperature=0.3, max_tokens=200,
+                                    fallback=lambda: self._fallback_metadata_format(metadata))
+            return self._complete(messages, temperature=0.3, max_tokens=200)
         except Exception as e:
-            print(f"LLM Error: {e}")
+            log.warning("LLM Error: %s", e)
             # Fallback to structured format
-            return self._fallback_metadata_format(metadata)
+            fallback_text = self._fallback_metadata_format(metadata)
+            return iter((fallback_text,)) if stream else fallback_text
     
-    def format_price_response(self, price_data: Dict, intent: str) -> str:
-        """Format price data into natural language"""
+    def format_price_response(self, price_data: Dict, intent: str, stream: bool = False) -> Union[str, Iterator[str]]:
+        """Format price data into natural language (text chunks if stream)"""
         try:
             if intent == "price":
                 prompt = f"""Format this price data into a natural response:
@@ -95,30 +201,30 @@ Current Price: ${price_data.get('price'):,.2f}
 Keep it brief and friendly. Do NOT add any information beyond what's provided."""
             
             messages = [
-                {"role": "system", "content": self.SYSTEM_PROMPT},
+                self.SYSTEM_MESSAGE,
                 {"role": "user", "content": prompt}
             ]
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=0.3,
-                max_tokens=150
-            )
-            
-            return response.choices[0].message.content.strip()
+            if stream:
+                return self._stream(messages, temperature=0.3, max_tokens=150,
+                                    fallback=lambda: self._fallback_price_format(price_data, intent))
+            return self._complete(messages, temperature=0.3, max_tokens=150)
         except Exception as e:
-            print(f"LLM Error: {e}")
+            log.warning("LLM Error: %s", e)
             # Fallback to structured format
-            return self._fallback_price_format(price_data, intent)
+            fallback_text = self._fallback_price_format(price_data, intent)
+            return iter((fallback_text,)) if stream else fallback_text
     
-    def format_news_response(self, news_items: list, entity: str) -> str:
-        """Format news items into natural language"""
+    def format_news_response(self, news_items: list, entity: str, stream: bool = False) -> Union[str, Iterator[str]]:
+        """Format news items into natural language (text chunks if stream)"""
         try:
-            news_text = "\n".join([f"- {item['title']} ({item['source']})" for item in news_items])
+            news_text = "\n".join(
+                f"- {item['title']} ({item['source']})"
+                for item in news_items if 'title' in item and 'source' in item
+            )
             
             messages = [
-                {"role": "system", "content": self.SYSTEM_PROMPT},
+                self.SYSTEM_MESSAGE,
                 {"role": "user", "content": f"""Format these news headlines for {entity} into a concise list.
 Do NOT summarize opinions. Just list the facts/headlines.
 
@@ -128,24 +234,22 @@ News:
 Format as a bulleted list."""}
             ]
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=0.3,
-                max_tokens=200
-            )
-            
-            return response.choices[0].message.content.strip()
+            if stream:
+                return self._stream(messages, temperature=0.3, max_tokens=200,
+                                    fallback=lambda: self._fallback_news_format(news_items))
+            return self._complete(messages, temperature=0.3, max_tokens=200)
         except Exception as e:
-            print(f"LLM Error: {e}")
-            return self._fallback_news_format(news_items)
+            log.warning("LLM Error: %s", e)
+            fallback_text = self._fallback_news_format(news_items)
+            return iter((fallback_text,)) if stream else fallback_text
 
     def _fallback_news_format(self, news_items: list) -> str:
         """Fallback formatting for news"""
-        lines = ["Latest News:"]
-        for item in news_items:
-            lines.append(f"• {item['title']} - {item['source']}")
-        return "\n".join(lines)
+        items = "".join(
+            f"\n• {item['title']} - {item['source']}"
+            for item in news_items if 'title' in item and 'source' in item
+        )
+        return "Latest News:" + items
     
     def _fallback_metadata_format(self, metadata: Dict) -> str:
         """Fallback formatting for metadata"""
@@ -177,29 +281,52 @@ Format as a bulleted list."""}
             return f"Market cap of {price_data.get('symbol')}: ${price_data.get('market_cap', 0):,.0f}\n\n• Current Price: ${price_data.get('price'):,.2f}"
             
     def extract_date_from_query(self, query: str) -> str:
-        """Extract target date from query in YYYY-MM-DD format"""
+        """
+        Extract target date from query in YYYY-MM-DD format
+        
+        Explicit YYYY-MM-DD dates are taken as-is and other complete dates
+        are parsed locally with dateparser ("yesterday", "3 days ago",
+        "on March 3 2023"); the LLM is only asked when that finds nothing.
+        Partial dates ("in 2021", "in March") are never completed from today.
+        """
+        for match in _ISO_DATE_RE.finditer(query):
+            try:
+                return datetime.strptime(match.group(), "%Y-%m-%d").strftime("%Y-%m-%d")
+            except ValueError:
+                continue
+        
+        if search_dates is not None:
+            try:
+                found = search_dates(
+                    query,
+                    languages=["en"],
+                    settings={
+                        "RELATIVE_BASE": datetime.now(),
+                        "PREFER_DATES_FROM": "past",
+                        # Don't fill in a missing day/month from RELATIVE_BASE
+                        "REQUIRE_PARTS": ["day", "month", "year"]
+                    }
+                )
+                if found:
+                    return found[0][1].strftime("%Y-%m-%d")
+            except Exception as e:
+                log.warning("Date Parsing Error: %s", e)
+        
         try:
             today = datetime.now().strftime("%Y-%m-%d")
             messages = [
-                {"role": "system", "content": f"You are a date extractor. Today is {today}. Extract the target date from the user query in YYYY-MM-DD format. If date is relative (yesterday, last week, 3 days ago), calculate it. Return ONLY the date string (YYYY-MM-DD) with no other text. If no specific date found, return 'None'."},
-                {"role": "user", "content": query}
+                self.DATE_SYSTEM_MESSAGE,
+                {"role": "user", "content": f"Today is {today}.\nQuery: {query}"}
             ]
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=0.1,
-                max_tokens=20
-            )
-            
-            result = response.choices[0].message.content.strip()
+            result = self._complete(messages, temperature=0.1, max_tokens=20)
             return None if result == 'None' else result
         except Exception as e:
-            print(f"Date Extraction Error: {e}")
+            log.warning("Date Extraction Error: %s", e)
             return None
 
-    def format_history_response(self, history_data: Dict) -> str:
-        """Format history data into natural language"""
+    def format_history_response(self, history_data: Dict, stream: bool = False) -> Union[str, Iterator[str]]:
+        """Format history data into natural language (text chunks if stream)"""
         try:
             prompt = f"""Format this historical price data into a natural response for {history_data.get('symbol')}:
 
@@ -210,29 +337,31 @@ Market Cap: ${history_data.get('market_cap'):,.0f}
 Keep it brief and factual. Mention the date clearly."""
             
             messages = [
-                {"role": "system", "content": self.SYSTEM_PROMPT},
+                self.SYSTEM_MESSAGE,
                 {"role": "user", "content": prompt}
             ]
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=0.3,
-                max_tokens=100
-            )
-            
-            return response.choices[0].message.content.strip()
+            if stream:
+                return self._stream(messages, temperature=0.3, max_tokens=100,
+                                    fallback=lambda: self._fallback_history_format(history_data))
+            return self._complete(messages, temperature=0.3, max_tokens=100)
         except Exception as e:
-            print(f"LLM Error: {e}")
-            return f"On {history_data.get('date')}, the price of {history_data.get('symbol')} was ${history_data.get('price'):,.2f}."
+            log.warning("LLM Error: %s", e)
+            fallback_text = self._fallback_history_format(history_data)
+            return iter((fallback_text,)) if stream else fallback_text
     
-    def format_comparison_response(self, comparison_data: list) -> str:
-        """Format comparison data into natural language with table"""
+    def _fallback_history_format(self, history_data: Dict) -> str:
+        """Fallback formatting for history data"""
+        return f"On {history_data.get('date')}, the price of {history_data.get('symbol')} was ${history_data.get('price'):,.2f}."
+    
+    def format_comparison_response(self, comparison_data: list, stream: bool = False) -> Union[str, Iterator[str]]:
+        """Format comparison data into natural language with table (text chunks if stream)"""
         try:
             # Prepare data summary for prompt
-            data_str = ""
-            for item in comparison_data:
-                data_str += f"- {item.get('symbol')}: Price=${item.get('price')}, Rank={item.get('rank')}, MCap=${item.get('market_cap')}, Change24h={item.get('change_24h')}%\n"
+            data_str = "".join(
+                f"- {item.get('symbol')}: Price=${item.get('price')}, Rank={item.get('rank')}, MCap=${item.get('market_cap')}, Change24h={item.get('change_24h')}%\n"
+                for item in comparison_data
+            )
             
             prompt = f"""Compare these cryptocurrencies based on the following data:
 {data_str}
@@ -243,18 +372,15 @@ Format the response as:
 3. Keep it factual and concise."""
             
             messages = [
-                {"role": "system", "content": self.SYSTEM_PROMPT},
+                self.SYSTEM_MESSAGE,
                 {"role": "user", "content": prompt}
             ]
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=0.3,
-                max_tokens=300
-            )
-            
-            return response.choices[0].message.content.strip()
+            if stream:
+                return self._stream(messages, temperature=0.3, max_tokens=300,
+                                    fallback=lambda: "Unable to generate comparison table.")
+            return self._complete(messages, temperature=0.3, max_tokens=300)
         except Exception as e:
-            print(f"LLM Error: {e}")
-            return "Unable to generate comparison table."
+            log.warning("LLM Error: %s", e)
+            fallback_text = "Unable to generate comparison table."
+            return iter((fallback_text,)) if stream else fallback_text
@@ -3,26 +3,53 @@ Short-term conversation memory system
 Tracks last 8-10 turns and resolves pronouns
 """
 from typing import List, Dict, Optional
-from collections import deque
+import re
+import sys
+import threading
+import time
 from datetime import datetime
 
+from detector import EntityDetector
+
+# Words that refer back to the last mentioned coin, plus the nouns that do
+# so after "the" ("the coin", "the token"); matched against whole words
+_PRONOUNS = frozenset({'it', 'its', 'this', 'that', 'same'})
+_PRONOUN_NOUNS = frozenset({'coin', 'token'})
+_WORD_RE = re.compile(r"\w+")  # same as IntentClassifier.WORD_RE
+
 
 class ConversationMemory:
     """Manages short-term conversation memory"""
     
-    def __init__(self, max_turns: int = 10, known_coins: dict = None):
+    def __init__(self, max_turns: int = 10, known_coins: dict = None,
+                 entity_detector: Optional[EntityDetector] = None):
         """
         Initialize conversation memory
         
         Args:
             max_turns: Maximum number of turns to remember
             known_coins: Dict mapping symbols to coin names
+            entity_detector: Shared EntityDetector over known_coins (its
+                compiled matcher is reused instead of built per session)
         """
         self.max_turns = max_turns
         self.known_coins = known_coins or {}
-        self.history = deque(maxlen=max_turns)
+        self._entity_detector = entity_detector or EntityDetector(self.known_coins)
+        # Ring buffer of turns: _head is the next slot to write. The lock
+        # keeps concurrent same-session writes and reads consistent
+        self._buf = [None] * max_turns
+        self._head = 0
+        self._size = 0
+        self._lock = threading.Lock()
         self.last_entity = None
-        self.last_entity_timestamp = None
+        self._last_entity_time = None  # epoch seconds
+    
+    @property
+    def last_entity_timestamp(self) -> Optional[str]:
+        """When last_entity was set, as an ISO-8601 string (None if never)"""
+        if self._last_entity_time is None:
+            return None
+        return datetime.fromtimestamp(self._last_entity_time).isoformat()
     
     def add_turn(self, role: str, content: str, entity: Optional[str] = None):
         """
@@ -37,15 +64,22 @@ class ConversationMemory:
             "role": role,
             "content": content,
             "entity": entity,
-            "timestamp": datetime.now().isoformat()
+            # Epoch seconds; formatted as ISO only in get_history()
+            "timestamp": time.time()
         }
         
-        self.history.append(turn)
-        
-        # Update last entity if present
-        if entity:
-            self.last_entity = entity
-            self.last_entity_timestamp = turn["timestamp"]
+        with self._lock:
+            # max_turns=0 keeps no history, like deque(maxlen=0)
+            if self.max_turns > 0:
+                self._buf[self._head] = turn
+                self._head = (self._head + 1) % self.max_turns
+                if self._size < self.max_turns:
+                    self._size += 1
+            
+            # Update last entity if present
+            if entity:
+                self.last_entity = entity
+                self._last_entity_time = turn["timestamp"]
     
     def get_history(self, num_turns: Optional[int] = None) -> List[Dict]:
         """
@@ -55,12 +89,23 @@ class ConversationMemory:
             num_turns: Number of recent turns to get
             
         Returns:
-            List of turns in chronological order
+            List of turns in chronological order (ISO-8601 timestamps)
         """
-        if num_turns is None:
-            return list(self.history)
-        else:
-            return list(self.history)[-num_turns:]
+        with self._lock:
+            count = self._size
+            if num_turns and num_turns < count:
+                count = num_turns
+            
+            # Copy only the requested tail, in two slices if it wraps
+            start = self._head - count
+            if start >= 0:
+                turns = self._buf[start:self._head]
+            else:
+                turns = self._buf[start:] + self._buf[:self._head]
+        return [
+            {**turn, "timestamp": datetime.fromtimestamp(turn["timestamp"]).isoformat()}
+            for turn in turns
+        ]
     
     def get_last_entity(self) -> Optional[str]:
         """Get the last mentioned crypto entity"""
@@ -76,64 +121,72 @@ class ConversationMemory:
         Returns:
             Resolved entity symbol or None
         """
-        query_lower = query.lower()
-        
-        # Check if query contains pronoun
-        pronouns = ['it', 'its', 'this', 'that', 'the coin', 'the token', 'same']
-        has_pronoun = any(pronoun in query_lower for pronoun in pronouns)
-        
-        if not has_pronoun:
+        # Tokenize once, then set lookups instead of regex alternation
+        words = _WORD_RE.findall(query.lower())
+        if _PRONOUNS.isdisjoint(words) and not any(
+            word == 'the' and following in _PRONOUN_NOUNS
+            for word, following in zip(words, words[1:])
+        ):
             return None
         
         # Return last entity
         return self.last_entity
     
     def extract_entity_from_turn(self, content: str) -> Optional[str]:
-        """Extract crypto entity from turn content"""
-        content_upper = content.upper()
-        
-        # Check for symbols
-        for symbol in self.known_coins.keys():
-            if symbol in content_upper:
-                return symbol
-        
-        # Check for coin names
-        content_lower = content.lower()
-        for symbol, name in self.known_coins.items():
-            if name.lower() in content_lower:
-                return symbol
-        
-        return None
+        """Extract crypto entity from turn content (symbols before names, one scan)"""
+        symbol, _ = self._entity_detector.detect_entity(content)
+        return symbol
     
     def clear_history(self):
         """Clear conversation history"""
-        self.history.clear()
-        self.last_entity = None
-        self.last_entity_timestamp = None
+        with self._lock:
+            self._buf = [None] * self.max_turns
+            self._head = 0
+            self._size = 0
+            self.last_entity = None
+            self._last_entity_time = None
 
 
 class SessionManager:
     """Manages multiple conversation sessions"""
     
-    def __init__(self, known_coins: dict):
-        self.known_coins = known_coins
+    def __init__(self, known_coins: dict, max_turns: int = 10):
+        """
+        Initialize session manager
+        
+        Args:
+            known_coins: Dict mapping symbols to coin names
+            max_turns: Turns remembered per session
+        """
+        # Canonical (uppercased, interned) symbols, shared by every session
+        self.known_coins = {sys.intern(symbol.upper()): name for symbol, name in known_coins.items()}
+        self.max_turns = max_turns
+        self.entity_detector = EntityDetector(self.known_coins)
         self.sessions = {}  # session_id -> ConversationMemory
+        self._lock = threading.Lock()
     
     def get_memory(self, session_id: str) -> ConversationMemory:
         """Get or create memory for session"""
-        if session_id not in self.sessions:
-            self.sessions[session_id] = ConversationMemory(
-                max_turns=10,
-                known_coins=self.known_coins
-            )
-        return self.sessions[session_id]
+        memory = self.sessions.get(session_id)
+        if memory is not None:
+            return memory
+        
+        with self._lock:
+            if session_id not in self.sessions:
+                self.sessions[session_id] = ConversationMemory(
+                    max_turns=self.max_turns,
+                    known_coins=self.known_coins,
+                    entity_detector=self.entity_detector
+                )
+            return self.sessions[session_id]
     
     def clear_session(self, session_id: str):
         """Clear a specific session"""
-        if session_id in self.sessions:
-            self.sessions[session_id].clear_history()
+        memory = self.sessions.get(session_id)
+        if memory is not None:
+            memory.clear_history()
     
     def delete_session(self, session_id: str):
         """Delete a session"""
-        if session_id in self.sessions:
-            del self.sessions[session_id]
+        with self._lock:
+            self.sessions.pop(session_id, None)
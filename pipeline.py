@@ -4,6 +4,13 @@ Main processing pipeline with hallucination prevention
 """
 from typing import Dict, Optional
 from datetime import datetime
+from functools import lru_cache
+
+
+@lru_cache(maxsize=64)
+def _source_tag(source: str, confidence: float) -> str:
+    """Source/confidence footer (few distinct pairs per session, so cached)"""
+    return f"\n\n📊 Source: {source}\n🎯 Confidence: {confidence:.1f}"
 
 
 class KnowledgeFirstPipeline:
@@ -11,7 +18,19 @@ class KnowledgeFirstPipeline:
     
     INSUFFICIENT_DATA_MESSAGE = "INSUFFICIENT DATA – Not found in Knowledge Base or API"
     
-    def __init__(self, kb_manager, api_tool, news_tool, detector, memory, llm_orchestrator):
+    # Intents answered about exactly one coin
+    SINGLE_COIN_INTENTS = ("metadata", "price", "market_cap", "news", "price_history")
+    
+    # Copied for every "no data" result (see _insufficient)
+    _INSUFFICIENT_TEMPLATE = {
+        "response": INSUFFICIENT_DATA_MESSAGE,
+        "source": None,
+        "confidence": 0.0,
+        "entity": None,
+        "intent": None
+    }
+    
+    def __init__(self, kb_manager, api_tool, news_tool, detector, memory=None, llm_orchestrator=None):
         """
         Initialize pipeline
         
@@ -20,7 +39,7 @@ class KnowledgeFirstPipeline:
             api_tool: FreeCryptoAPITool instance
             news_tool: CryptoNewsTool instance
             detector: CryptoQueryDetector instance
-            memory: ConversationMemory instance
+            memory: Default ConversationMemory instance (can be passed per query)
             llm_orchestrator: LLMOrchestrator instance
         """
         self.kb = kb_manager
@@ -30,13 +49,19 @@ class KnowledgeFirstPipeline:
         self.memory = memory
         self.llm = llm_orchestrator
     
-    def process_query(self, query: str) -> Dict:
+    def process_query(self, query: str, memory=None, stream: bool = False) -> Dict:
         """
         Process user query through knowledge-first pipeline
         
+        Args:
+            query: User query
+            memory: Session ConversationMemory (defaults to the one given at construction)
+            stream: Return LLM-formatted responses as an iterator of text
+                chunks instead of a string (see LLMOrchestrator._stream)
+        
         Returns:
             {
-                "response": str,
+                "response": str (or Iterator[str] when stream is set),
                 "source": str or None,
                 "confidence": float,
                 "entity": str or None,
@@ -44,8 +69,22 @@ class KnowledgeFirstPipeline:
             }
         """
         # Step 1: Detect entity and intent
-        detection = self.detector.detect(query)
+        memory = memory if memory is not None else self.memory
+        detection = self.detector.detect(query, memory=memory)
+        return self.process_query_with_detection(query, detection, stream)
+    
+    def process_query_with_detection(self, query: str, detection: Dict, stream: bool = False) -> Dict:
+        """
+        Process a query the caller has already run through the detector
         
+        Args:
+            query: User query
+            detection: CryptoQueryDetector.detect() result for the query
+            stream: See process_query
+        
+        Returns:
+            Same as process_query
+        """
         # Step 2: Check if intent should be rejected
         if detection["should_reject"]:
             return self._reject_response(detection)
@@ -55,31 +94,35 @@ class KnowledgeFirstPipeline:
             return self._clarification_response(detection)
         
         entity = detection["detected_entity"]
-        entities = detection.get("detected_entities", [])
+        entities = detection["detected_entities"]
         intent = detection["detected_intent"]
         
-        # Step 4: Route based on intent
+        # Step 4: Single-coin questions with no coin detected have no data to look up
+        if entity is None and intent in self.SINGLE_COIN_INTENTS:
+            return self._insufficient(None, intent)
+        
+        # Step 5: Route based on intent
         if intent == "metadata":
-            return self._handle_metadata(entity, detection)
+            return self._handle_metadata(entity, detection, stream)
         elif intent in ["price", "market_cap"]:
-            return self._handle_price_data(entity, intent, detection)
+            return self._handle_price_data(entity, intent, detection, stream)
         elif intent == "news":
-            return self._handle_news(entity, detection)
+            return self._handle_news(entity, detection, stream)
         elif intent == "price_history":
-            return self._handle_history(entity, detection, query)
+            return self._handle_history(entity, detection, query, stream)
         elif intent == "comparison":
-            return self._handle_comparison(entities, detection)
+            return self._handle_comparison(entities, detection, stream)
         else:
             return self._clarification_response(detection)
     
-    def _handle_metadata(self, entity: str, detection: Dict) -> Dict:
+    def _handle_metadata(self, entity: str, detection: Dict, stream: bool = False) -> Dict:
         """Handle metadata queries (static data from KB)"""
         # Search KB for metadata
         kb_data = self.kb.get_coin_metadata(entity)
         
         if kb_data:
             # Format response using LLM
-            response_text = self.llm.format_metadata_response(kb_data)
+            response_text = self.llm.format_metadata_response(kb_data, stream=stream)
             
             return {
                 "response": response_text,
@@ -90,22 +133,16 @@ class KnowledgeFirstPipeline:
             }
         else:
             # No metadata in KB
-            return {
-                "response": self.INSUFFICIENT_DATA_MESSAGE,
-                "source": None,
-                "confidence": 0.0,
-                "entity": entity,
-                "intent": "metadata"
-            }
+            return self._insufficient(entity, "metadata")
     
-    def _handle_price_data(self, entity: str, intent: str, detection: Dict) -> Dict:
+    def _handle_price_data(self, entity: str, intent: str, detection: Dict, stream: bool = False) -> Dict:
         """Handle price/market cap queries with API tool"""
         # Use API tool (which checks KB cache first)
         result = self.api.get_crypto_data(entity)
         
         if result["success"]:
             # Format response using LLM
-            response_text = self.llm.format_price_response(result["data"], intent)
+            response_text = self.llm.format_price_response(result["data"], intent, stream=stream)
             
             return {
                 "response": response_text,
@@ -116,21 +153,15 @@ class KnowledgeFirstPipeline:
             }
         else:
             # API failed
-            return {
-                "response": self.INSUFFICIENT_DATA_MESSAGE,
-                "source": None,
-                "confidence": 0.0,
-                "entity": entity,
-                "intent": intent
-            }
-    def _handle_news(self, entity: str, detection: Dict) -> Dict:
+            return self._insufficient(entity, intent)
+    def _handle_news(self, entity: str, detection: Dict, stream: bool = False) -> Dict:
         """Handle news queries"""
         # Use News tool
         result = self.news.get_news(entity)
         
         if result["success"]:
             # Format response using LLM
-            response_text = self.llm.format_news_response(result["data"], entity)
+            response_text = self.llm.format_news_response(result["data"], entity, stream=stream)
             
             return {
                 "response": response_text,
@@ -141,20 +172,25 @@ class KnowledgeFirstPipeline:
             }
         else:
             # API failed
+            return self._insufficient(entity, "news")
+
+    def _handle_history(self, entity: str, detection: Dict, query: str, stream: bool = False) -> Dict:
+        """Handle historical price queries"""
+        date = self.llm.extract_date_from_query(query)
+        if not date:
             return {
-                "response": self.INSUFFICIENT_DATA_MESSAGE,
+                "response": f"Which date would you like the {entity} price for?",
                 "source": None,
                 "confidence": 0.0,
                 "entity": entity,
-                "intent": "news"
+                "intent": "price_history"
             }
-
-    def _handle_history(self, entity: str, detection: Dict, query: str) -> Dict:
-        """Handle historical price queries"""
-        # ... (keep existing code)
+        
+        result = self.news.get_history(entity, date)
+        
         if result["success"]:
             # Format response
-            response_text = self.llm.format_history_response(result["data"])
+            response_text = self.llm.format_history_response(result["data"], stream=stream)
             
             return {
                 "response": response_text,
@@ -172,7 +208,7 @@ class KnowledgeFirstPipeline:
                 "intent": "price_history"
             }
 
-    def _handle_comparison(self, entities: list, detection: Dict) -> Dict:
+    def _handle_comparison(self, entities: list, detection: Dict, stream: bool = False) -> Dict:
         """Handle comparison queries"""
         if not entities or len(entities) < 2:
             return {
@@ -183,30 +219,23 @@ class KnowledgeFirstPipeline:
                 "intent": "comparison"
             }
             
-        results = []
-        sources = set()
-        total_confidence = 0
-        
-        for entity in entities:
-            # Get current data (price/mcap)
-            res = self.api.get_crypto_data(entity)
-            if res["success"]:
-                results.append(res["data"])
-                if res["source"]:
-                    sources.add(res["source"])
-                total_confidence += res["confidence"]
+        # Get current data (price/mcap) for all coins concurrently
+        responses = self.api.get_crypto_data_many(entities)
+        found = [responses[entity] for entity in entities if responses[entity]["success"]]
+        results = [res["data"] for res in found]
+        
+        # Distinct sources in first-seen order (at most a handful)
+        sources = []
+        for res in found:
+            if res["source"] and res["source"] not in sources:
+                sources.append(res["source"])
+        total_confidence = sum(res["confidence"] for res in found)
         
         if not results:
-             return {
-                "response": self.INSUFFICIENT_DATA_MESSAGE,
-                "source": None,
-                "confidence": 0.0,
-                "entity": ", ".join(entities),
-                "intent": "comparison"
-             }
+            return self._insufficient(", ".join(entities), "comparison")
 
         # Format comparison
-        response_text = self.llm.format_comparison_response(results)
+        response_text = self.llm.format_comparison_response(results, stream=stream)
         
         avg_confidence = total_confidence / len(results) if results else 0.0
         source_str = ", ".join(sources) if sources else "Knowledge Base"
@@ -219,15 +248,16 @@ class KnowledgeFirstPipeline:
             "intent": "comparison"
         }
 
+    def _insufficient(self, entity: Optional[str], intent: str) -> Dict:
+        """INSUFFICIENT DATA result for an entity/intent"""
+        result = self._INSUFFICIENT_TEMPLATE.copy()
+        result["entity"] = entity
+        result["intent"] = intent
+        return result
+    
     def _reject_response(self, detection: Dict) -> Dict:
         """Return rejection response for disallowed intents"""
-        return {
-            "response": self.INSUFFICIENT_DATA_MESSAGE,
-            "source": None,
-            "confidence": 0.0,
-            "entity": detection["detected_entity"],
-            "intent": detection["detected_intent"]
-        }
+        return self._insufficient(detection["detected_entity"], detection["detected_intent"])
     
     def _clarification_response(self, detection: Dict) -> Dict:
         """Return clarification request"""
@@ -245,9 +275,7 @@ class KnowledgeFirstPipeline:
         source = result["source"]
         confidence = result["confidence"]
         
-        if source:
-            source_tag = f"\n\n📊 Source: {source}\n🎯 Confidence: {confidence:.1f}"
-        else:
-            source_tag = ""
+        if not source:
+            return response
         
-        return f"{response}{source_tag}"
+        return response + _source_tag(source, round(confidence, 1))
@@ -6,19 +6,6 @@ import uuid
 # Add backend to path
 sys.path.append(os.path.join(os.getcwd(), 'backend'))
 
-try:
-    from config import Config
-    from knowledge_base import KnowledgeBaseManager
-    from crypto_tools import FreeCryptoAPITool, CryptoNewsTool
-    from memory import SessionManager
-    from detector import CryptoQueryDetector
-    from llm_orchestrator import LLMOrchestrator
-    from pipeline import KnowledgeFirstPipeline
-except ImportError as e:
-    st.error(f"Error importing backend components: {e}")
-    st.info("Make sure you are running this from the project root directory.")
-    st.stop()
-
 # Page Config
 st.set_page_config(
     page_title="Agentic Crypto Assistant",
@@ -44,6 +31,11 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Messages rendered per rerun ("Load older messages" shows this many more)
+RENDER_WINDOW = 50
+# Messages kept per browser session
+MAX_STORED_MESSAGES = 500
+
 # Initialize Session State
 if 'session_id' not in st.session_state:
     st.session_state.session_id = str(uuid.uuid4())
@@ -51,36 +43,76 @@ if 'session_id' not in st.session_state:
 if 'messages' not in st.session_state:
     st.session_state.messages = []
 
+if 'render_window' not in st.session_state:
+    st.session_state.render_window = RENDER_WINDOW
+
+if len(st.session_state.messages) > MAX_STORED_MESSAGES:
+    del st.session_state.messages[:-MAX_STORED_MESSAGES]
+
 @st.cache_resource
 def get_components():
     """Initialize backend components once"""
+    # Imported here so the backend's dependency tree loads once per
+    # process, after the page shell has started rendering
+    try:
+        from config import Config, configure_logging
+        from knowledge_base import KnowledgeBaseManager
+        from crypto_tools import FreeCryptoAPITool, CryptoNewsTool, create_http_session
+        from memory import SessionManager
+        from detector import CryptoQueryDetector
+        from llm_orchestrator import LLMOrchestrator
+        from pipeline import KnowledgeFirstPipeline
+    except ImportError as e:
+        st.error(f"Error importing backend components: {e}")
+        st.info("Make sure you are running this from the project root directory.")
+        return None, None, None, None
+    
+    # Once per process (this function is cached), like app.py at import
+    configure_logging()
+    
     try:
         Config.validate()
         
-        kb_manager = KnowledgeBaseManager(Config.KB_FILE_PATH)
-        session_manager = SessionManager(Config.KNOWN_COINS)
+        kb_manager = KnowledgeBaseManager(Config.KB_FILE_PATH, flush_delay_seconds=Config.KB_FLUSH_SECONDS)
+        session_manager = SessionManager(Config.KNOWN_COINS, max_turns=Config.MAX_CONVERSATION_TURNS)
         llm_orchestrator = LLMOrchestrator(Config.OPENAI_API_KEY)
         
+        http_session = create_http_session(http2=Config.HTTP2)
+        
         api_tool = FreeCryptoAPITool(
             api_key=Config.FREECRYPTO_API_KEY,
             kb_manager=kb_manager,
-            freshness_ttl_minutes=Config.FRESHNESS_TTL_MINUTES
+            freshness_ttl_minutes=Config.FRESHNESS_TTL_MINUTES,
+            session=http_session
         )
         
         news_tool = CryptoNewsTool(
             api_key=Config.CRYPTONEWS_API_KEY,
-            kb_manager=kb_manager
+            kb_manager=kb_manager,
+            session=http_session
+        )
+        
+        # Stateless apart from the injected services; session memory is
+        # passed per query
+        detector = CryptoQueryDetector(Config.KNOWN_COINS)
+        
+        pipeline = KnowledgeFirstPipeline(
+            kb_manager=kb_manager,
+            api_tool=api_tool,
+            news_tool=news_tool,
+            detector=detector,
+            llm_orchestrator=llm_orchestrator
         )
         
-        return kb_manager, session_manager, llm_orchestrator, api_tool, news_tool
+        return kb_manager, session_manager, detector, pipeline
     except Exception as e:
         st.error(f"Component Initialization Error: {e}")
-        return None, None, None, None, None
+        return None, None, None, None
 
 # Load components
-kb_manager, session_manager, llm_orchestrator, api_tool, news_tool = get_components()
+kb_manager, session_manager, detector, pipeline = get_components()
 
-if not all([kb_manager, session_manager, llm_orchestrator, api_tool]):
+if not all([kb_manager, session_manager, detector, pipeline]):
     st.stop()
 
 # Sidebar
@@ -89,20 +121,26 @@ with st.sidebar:
     st.markdown("---")
     if st.button("Reset Conversation", type="primary"):
         st.session_state.messages = []
+        st.session_state.render_window = RENDER_WINDOW
         st.session_state.session_id = str(uuid.uuid4())
         session_manager.clear_session(st.session_state.session_id)
         st.rerun()
     
+    if len(st.session_state.messages) > st.session_state.render_window:
+        if st.button("Load older messages"):
+            st.session_state.render_window += RENDER_WINDOW
+            st.rerun()
+    
     st.markdown("### System Status")
-    st.success(f"Knowledge Base: {len(kb_manager.get_all_coins())} coins")
+    st.success(f"Knowledge Base: {kb_manager.coin_count()} coins")
     st.info("API Connections: Active")
 
 # Main Interface
 st.title("🤖 Agentic Crypto Assistant")
 st.markdown("Ask about prices, history, news, or compare coins!")
 
-# Display Chat History
-for message in st.session_state.messages:
+# Display Chat History (only the most recent messages)
+for message in st.session_state.messages[-st.session_state.render_window:]:
     with st.chat_message(message["role"]):
         st.markdown(message["content"])
 
@@ -120,24 +158,12 @@ if prompt := st.chat_input("What would you like to know?"):
                 # Get memory for session
                 memory = session_manager.get_memory(st.session_state.session_id)
                 
-                # Init per-request components
-                detector = CryptoQueryDetector(Config.KNOWN_COINS, memory)
-                
-                pipeline = KnowledgeFirstPipeline(
-                    kb_manager=kb_manager,
-                    api_tool=api_tool,
-                    news_tool=news_tool,
-                    detector=detector,
-                    memory=memory,
-                    llm_orchestrator=llm_orchestrator
-                )
-                
                 # Detect and add to memory
-                detection = detector.detect(prompt)
+                detection = detector.detect(prompt, memory=memory)
                 memory.add_turn("user", prompt, detection["detected_entity"])
                 
                 # Run pipeline
-                result = pipeline.process_query(prompt)
+                result = pipeline.process_query_with_detection(prompt, detection)
                 formatted_response = pipeline.format_final_response(result)
                 
                 # Add source styling if needed (basic markdown for now)
@@ -0,0 +1,35 @@
+"""
+Tests for the upstream API tools and their caches
+Run from the project root: python -m unittest discover tests
+"""
+import time
+import unittest
+
+from crypto_tools import TTLCache, FRESH, MISS
+
+
+class TTLCacheTest(unittest.TestCase):
+    """TTLCache stays bounded as new keys arrive"""
+    
+    def test_size_cap_evicts_least_recently_written(self):
+        cache = TTLCache(ttl_seconds=60, stale_seconds=180, max_entries=3)
+        for key in ("a", "b", "c"):
+            cache.set(key, key)
+        cache.set("a", "a2")
+        cache.set("d", "d")
+        
+        self.assertEqual(cache.get("b"), (None, MISS))
+        self.assertEqual(cache.get("a"), ("a2", FRESH))
+        self.assertEqual(len(cache._entries), 3)
+    
+    def test_expired_entries_are_evicted_on_set(self):
+        cache = TTLCache(ttl_seconds=0.01, stale_seconds=0.02)
+        cache.set("old", 1)
+        time.sleep(0.03)
+        cache.set("new", 2)
+        
+        self.assertEqual(list(cache._entries), ["new"])
+
+
+if __name__ == '__main__':
+    unittest.main()
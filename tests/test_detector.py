@@ -0,0 +1,57 @@
+"""
+Tests for entity and intent detection
+Run from the project root: python -m unittest discover tests
+"""
+import unittest
+
+from config import Config
+from detector import IntentClassifier, hyperscan
+from memory import ConversationMemory
+
+
+class RejectionScanTest(unittest.TestCase):
+    """The Hyperscan and regex rejection paths agree, including on non-ASCII text"""
+    
+    QUERIES = [
+        "should i buy btc", "will eth go up", "what if btc crashes", "price of btc",
+        "ifé", "éif", "willé btc", "café if", "naïve will", "日本if", "日本 if 日本", "prix du bitcoin",
+    ]
+    
+    def assert_matches_regex(self, classifier):
+        for query in self.QUERIES:
+            with self.subTest(query=query):
+                expected = IntentClassifier.REJECTION_RE.search(query) is not None
+                self.assertEqual(classifier.is_rejected(query), expected)
+    
+    def test_regex_path(self):
+        classifier = IntentClassifier()
+        classifier._rejection_db = None
+        self.assert_matches_regex(classifier)
+    
+    @unittest.skipIf(hyperscan is None, "hyperscan not installed")
+    def test_hyperscan_path(self):
+        classifier = IntentClassifier()
+        self.assertIsNotNone(classifier._rejection_db)
+        self.assert_matches_regex(classifier)
+
+
+class FollowUpTokenizationTest(unittest.TestCase):
+    """Follow-up detection and pronoun resolution split words the same way"""
+    
+    def test_contractions_are_follow_ups_and_pronouns(self):
+        classifier = IntentClassifier()
+        memory = ConversationMemory(known_coins=dict(Config.KNOWN_COINS))
+        memory.add_turn("user", "price of BTC", "BTC")
+        
+        for query in ("it's up?", "it?", "and its volume"):
+            with self.subTest(query=query):
+                self.assertTrue(classifier._is_follow_up(query))
+                self.assertEqual(memory.resolve_pronoun(query), "BTC")
+    
+    def test_words_inside_other_words_are_not_follow_ups(self):
+        classifier = IntentClassifier()
+        self.assertFalse(classifier._is_follow_up("bitcoin"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+"""
+Regression tests for the knowledge-first pipeline
+Run from the project root: python -m unittest discover tests
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from config import Config
+from crypto_tools import FreeCryptoAPITool, CryptoNewsTool
+from detector import CryptoQueryDetector
+from knowledge_base import KnowledgeBaseManager
+from pipeline import KnowledgeFirstPipeline
+
+
+class EntitylessQueryTest(unittest.TestCase):
+    """Single-coin questions that name no coin get INSUFFICIENT DATA, not an error"""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        kb_path = os.path.join(self.tmpdir, "coins.json")
+        shutil.copy(os.path.join(os.path.dirname(__file__), "..", "coins.json"), kb_path)
+        self.kb = KnowledgeBaseManager(kb_path)
+        self.api = FreeCryptoAPITool(api_key="test", kb_manager=self.kb)
+        self.news = CryptoNewsTool(api_key="test", kb_manager=self.kb)
+        self.pipeline = KnowledgeFirstPipeline(
+            kb_manager=self.kb,
+            api_tool=self.api,
+            news_tool=self.news,
+            detector=CryptoQueryDetector(Config.KNOWN_COINS)
+        )
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+    
+    def test_price_query_without_coin(self):
+        result = self.pipeline.process_query("What's the price?")
+        self.assertEqual(result["intent"], "price")
+        self.assertIsNone(result["entity"])
+        self.assertEqual(result["response"], KnowledgeFirstPipeline.INSUFFICIENT_DATA_MESSAGE)
+    
+    def test_news_query_without_coin(self):
+        result = self.pipeline.process_query("latest news")
+        self.assertEqual(result["intent"], "news")
+        self.assertIsNone(result["entity"])
+        self.assertEqual(result["response"], KnowledgeFirstPipeline.INSUFFICIENT_DATA_MESSAGE)
+    
+    def test_tools_without_symbol(self):
+        self.assertFalse(self.api.get_crypto_data(None)["success"])
+        self.assertFalse(self.api.get_crypto_data_many([None])[None]["success"])
+        self.assertFalse(self.news.get_news(None)["success"])
+        self.assertFalse(self.news.get_history(None, "2024-01-05")["success"])
+
+
+if __name__ == '__main__':
+    unittest.main()
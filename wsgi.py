@@ -0,0 +1,8 @@
+"""
+WSGI entry point for production servers
+Usage: gunicorn -k gthread -w 1 --threads 32 wsgi:app
+
+Run a single worker: the KB writer, caches and CoinGecko rate limiter
+live in-process and are not shared between worker processes.
+"""
+from app import app